@@ -6,8 +6,12 @@ from logging.handlers import RotatingFileHandler
 from pathlib import Path
 
 from .bridge import Bridge, FrontendAPI
+from .game import Prewarmer
 from .instancemanager import InstanceManager
+from .net import throttle
+from .packagestore import PackageStore
 from .path import ROOT_DIRECTORY
+from .settings import Settings
 from .versionretriever import VersionRetriever
 
 
@@ -15,12 +19,18 @@ def run(frontend_api: FrontendAPI) -> None:
     logs_directory = ROOT_DIRECTORY / "logs"
     _create_dirs(logs_directory)
     _setup_rotating_logger(logs_directory, "nl")
+    throttle.GOVERNOR.rate = Settings.bandwidth_limit
     Bridge.frontend_api = frontend_api
+    VersionRetriever.subscribe_to_change(Bridge.propel_version_catalog_change)
+    VersionRetriever.start_refreshing()
     InstanceManager.initialise_watchdog(frontend_api.static.on_sudden_change)
+    if instance := InstanceManager.last_instance:
+        Prewarmer.start(instance)
 
 
 def _create_dirs(logs_directory: Path) -> None:
     VersionRetriever.DIRECTORY.mkdir(parents=True, exist_ok=True)
+    PackageStore.DIRECTORY.mkdir(parents=True, exist_ok=True)
     InstanceManager.DIRECTORY.mkdir(parents=True, exist_ok=True)
     logs_directory.mkdir(parents=True, exist_ok=True)
 
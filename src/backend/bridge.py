@@ -4,18 +4,26 @@ import os
 from itertools import chain
 from typing import TYPE_CHECKING, Protocol, runtime_checkable
 
-from . import utility
+from . import packagemanager, utility
 from .core import Version
-from .game import Game
+from .game import DownloadJob, DownloadManager, Game, LinkCache, Prewarmer
 from .instancemanager import InstanceManager
+from .net import throttle
+from .settings import Settings
+from .tracing import Tracer
 from .versionretriever import VersionRetriever
 
 if TYPE_CHECKING:
-    from .core import Architecture, Instance
+    from collections.abc import Iterable
+
+    from .core import Architecture, Instance, VersionCatalog, VersionCatalogDiff
     from .report import Report
 
 
 class API:
+    def __init__(self) -> None:
+        self._versions_payload: _VersionsPayload | None = None
+
     def getInstanceGroups(self) -> list[dict[str, object]]:  # noqa: N802
         return [
             {
@@ -41,16 +49,49 @@ class API:
         return instance.directory.name if (instance := InstanceManager.last_instance) else None
 
     def getVersionTypeToVersions(self, remotely: bool = False) -> dict[Version.Type, list[dict[str, str | list[str]]]]:  # noqa: N802
-        versions = VersionRetriever.get_versions_remotely() if remotely else VersionRetriever.get_versions_locally()
+        if remotely:
+            VersionRetriever.refresh_in_background()
+        return self._get_versions_payload().version_type_to_versions
+
+    def queryVersions(  # noqa: N802
+        self,
+        version_type: Version.Type | None = None,
+        search: str = "",
+        offset: int = 0,
+        limit: int | None = None,
+    ) -> dict[str, object]:
+        """Return a page of the versions whose display name contains `search`, with the total number of matches.
+
+        The versions are limited to `version_type` if it is given. Those whose display name starts with `search` come
+        first.
+        """
+        payload = self._get_versions_payload()
+        versions = payload.catalog.search(search, None if version_type is None else Version.Type(version_type))
+        offset = max(offset, 0)
+        page = versions[offset : None if limit is None else offset + max(limit, 0)]
         return {
-            version_type: [
-                {"displayName": version.display_name, "availableArchitectures": list(version.available_architectures)}
-                for version in versions
-                if version.type == version_type
-            ]
-            for version_type in Version.Type
+            "total": len(versions),
+            "versions": [
+                {"type": version.type, "version": version_dict}
+                for version, version_dict in zip(page, payload.get_version_dicts(page), strict=True)
+            ],
         }
 
+    def getInstalledVersions(self) -> list[dict[str, str]]:  # noqa: N802
+        """Return the display name and architecture of every installed version, using a single package query."""
+        pfn_to_package_full_names = packagemanager.InstalledPackages.get()
+        return [
+            {"displayName": version.display_name, "architecture": architecture}
+            for version in VersionRetriever.get_versions_locally()
+            if (package_full_names := pfn_to_package_full_names.get(version.pfn))
+            for architecture in version.available_architectures
+            if version.get_package_full_name(architecture) in package_full_names
+        ]
+
+    def refreshVersions(self) -> None:  # noqa: N802
+        """Start fetching the version list. What has changed is pushed through `on_version_catalog_change`."""
+        VersionRetriever.refresh_in_background()
+
     def toggleInstanceGroupHidden(self, name: str) -> None:  # noqa: N802
         next(group for group in InstanceManager.instance_groups if group.name == name).toggle_hidden()
 
@@ -73,11 +114,7 @@ class API:
         instance = self._get_instance(dirname)
         if instance.version.display_name == version_display_name:
             return
-        instance.version = next(
-            version
-            for version in VersionRetriever.get_versions_locally()
-            if version.display_name == version_display_name
-        )
+        instance.version = self._get_version(version_display_name)
 
     def changeArchitectureChoice(self, dirname: str, architecture_choice: Architecture) -> None:  # noqa: N802
         instance = self._get_instance(dirname)
@@ -89,15 +126,7 @@ class API:
         InstanceManager.copy_instance(self._get_instance(dirname), copy_worlds)
 
     def createInstance(self, name: str, group_name: str, version_display_name: str) -> str:  # noqa: N802
-        return InstanceManager.create_instance(
-            name,
-            group_name,
-            next(
-                version
-                for version in VersionRetriever.get_versions_locally()
-                if version.display_name == version_display_name
-            ),
-        ).name
+        return InstanceManager.create_instance(name, group_name, self._get_version(version_display_name)).name
 
     def openGameDirectory(self, dirname: str) -> None:  # noqa: N802
         os.startfile(self._get_instance(dirname).directory / "com.mojang")  # noqa: S606
@@ -113,6 +142,89 @@ class API:
     def cancelInstanceLaunch(self) -> None:  # noqa: N802
         Game.cancel_launch()
 
+    def resetInstanceAccessGrants(self, dirname: str) -> None:  # noqa: N802
+        Game.reset_access_grants(self._get_instance(dirname))
+
+    def getDownloads(self) -> list[dict[str, object]]:  # noqa: N802
+        return [
+            {
+                "versionDisplayName": job.version.display_name,
+                "architecture": job.architecture,
+                "state": job.state,
+                "interactive": job.priority == DownloadJob.Priority.INTERACTIVE,
+                "report": job.report.to_dict() if job.report else None,
+            }
+            for job in DownloadManager.jobs
+        ]
+
+    def enqueueDownload(self, version_display_name: str, architecture: Architecture) -> None:  # noqa: N802
+        DownloadManager.enqueue(self._get_version(version_display_name), architecture)
+
+    def moveDownload(self, position: int, version_display_name: str, architecture: Architecture) -> None:  # noqa: N802
+        if job := self._get_download_job(version_display_name, architecture):
+            DownloadManager.move(position, job)
+
+    def cancelDownload(self, version_display_name: str, architecture: Architecture) -> None:  # noqa: N802
+        if job := self._get_download_job(version_display_name, architecture):
+            DownloadManager.cancel(job)
+
+    def getBandwidthLimit(self) -> int | None:  # noqa: N802
+        return limit // 1024 if (limit := Settings.bandwidth_limit) else None
+
+    def setBandwidthLimit(self, kilobytes_per_second: int | None) -> None:  # noqa: N802
+        limit = kilobytes_per_second * 1024 if kilobytes_per_second else None
+        throttle.GOVERNOR.rate = limit
+        Settings.bandwidth_limit = limit
+
+    def getVersionRefreshInterval(self) -> int | None:  # noqa: N802
+        return interval // 60 if (interval := Settings.version_refresh_interval) else None
+
+    def setVersionRefreshInterval(self, minutes: int | None) -> None:  # noqa: N802
+        Settings.version_refresh_interval = minutes * 60 if minutes else None
+        VersionRetriever.reschedule()
+
+    def getPrewarmEnabled(self) -> bool:  # noqa: N802
+        return Settings.prewarm_enabled
+
+    def setPrewarmEnabled(self, enabled: bool) -> None:  # noqa: N802
+        Settings.prewarm_enabled = enabled
+        if not enabled:
+            Prewarmer.cancel(cancel_download=True)
+        elif (instance := InstanceManager.last_instance) and not Game.launched_instance:
+            Prewarmer.start(instance)
+
+    def getLinkCacheStatistics(self) -> dict[str, int]:  # noqa: N802
+        return {"hits": LinkCache.hits, "misses": LinkCache.misses}
+
+    def getTracingEnabled(self) -> bool:  # noqa: N802
+        return Settings.tracing_enabled
+
+    def setTracingEnabled(self, enabled: bool) -> None:  # noqa: N802
+        Settings.tracing_enabled = enabled
+
+    def getLaunchTimings(self) -> list[dict[str, object]]:  # noqa: N802
+        """Return the span trees of the most recent launches, newest first."""
+        return [span.to_dict() for span in reversed(Tracer.recent_launches)]
+
+    def _get_versions_payload(self) -> _VersionsPayload:
+        versions = VersionRetriever.get_versions_locally()
+        payload = self._versions_payload
+        if payload is None or payload.catalog is not versions:
+            payload = self._versions_payload = _VersionsPayload(versions)
+        return payload
+
+    @staticmethod
+    def _get_version(display_name: str) -> Version:
+        version = VersionRetriever.get_versions_locally().get_by_display_name(display_name)
+        if version is None:
+            error_msg = f'There is no version "{display_name}".'
+            raise ValueError(error_msg)
+        return version
+
+    @classmethod
+    def _get_download_job(cls, version_display_name: str, architecture: Architecture) -> DownloadJob | None:
+        return DownloadManager.get_job(cls._get_version(version_display_name), architecture)
+
     @staticmethod
     def _get_instance(dirname: str) -> Instance:
         return next(
@@ -143,6 +255,34 @@ class Bridge:
             raise FrontendAPIAlreadySetError
         self._frontend_api = value
 
+    def propel_version_catalog_change(self, diff: VersionCatalogDiff) -> None:
+        """Push the changes of the version list to the frontend.
+
+        A version whose type has changed is sent as removed from its old type and added to the new one. Added versions
+        come with their index among the versions of their type, in ascending order, so inserting them one by one after
+        the removals and replacements puts every version in place.
+        """
+        versions = VersionRetriever.get_versions_locally()
+        removed = [*diff.removed, *(old for old, new in diff.changed if old.type != new.type)]
+        added = sorted(
+            (
+                (versions.get_versions_of_type(version.type).index(version), version)
+                for version in (*diff.added, *(new for old, new in diff.changed if old.type != new.type))
+            ),
+            key=lambda item: item[0],
+        )
+        changed = [new for old, new in diff.changed if old.type == new.type]
+        self.frontend_api.static.on_version_catalog_change(
+            {
+                "added": [
+                    {"type": version.type, "index": index, "version": _version_to_dict(version)}
+                    for index, version in added
+                ],
+                "removed": [{"type": version.type, "displayName": version.display_name} for version in removed],
+                "changed": [{"type": version.type, "version": _version_to_dict(version)} for version in changed],
+            },
+        )
+
 
 @runtime_checkable
 class FrontendAPI(Protocol):
@@ -154,12 +294,32 @@ class FrontendAPI(Protocol):
 
 class FrontendAPIStatic(Protocol):
     def on_sudden_change(self) -> None: ...
+    def on_version_catalog_change(self, diff: dict[str, object]) -> None: ...
 
 
 class FrontendAPITemporary(Protocol):
     def propel_launch_report(self, report: Report) -> None: ...
 
 
+class _VersionsPayload:
+    """The versions of a catalog as sent to the frontend, built once per catalog since it only changes on refreshes."""
+
+    def __init__(self, catalog: VersionCatalog) -> None:
+        self.catalog = catalog
+        self._name_to_version_dict = {version.name: _version_to_dict(version) for version in catalog}
+        self.version_type_to_versions = {
+            version_type: self.get_version_dicts(catalog.get_versions_of_type(version_type))
+            for version_type in Version.Type
+        }
+
+    def get_version_dicts(self, versions: Iterable[Version]) -> list[dict[str, str | list[str]]]:
+        return [self._name_to_version_dict[version.name] for version in versions]
+
+
+def _version_to_dict(version: Version) -> dict[str, str | list[str]]:
+    return {"displayName": version.display_name, "availableArchitectures": list(version.available_architectures)}
+
+
 class FrontendAPINotSetError(ValueError):
     pass
 
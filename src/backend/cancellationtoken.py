@@ -1,26 +1,97 @@
 from __future__ import annotations
 
+import logging
+import threading
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
 
 class CancellationTokenSource:
-    def __init__(self) -> None:
+    """Cancels its token, either when told to, when one of `linked_tokens` is cancelled or after `timeout` seconds."""
+
+    def __init__(self, *linked_tokens: CancellationToken | None, timeout: float | None = None) -> None:
         self._token = CancellationToken()
+        self._timer: threading.Timer | None = None
+        self._unregister_callbacks = [token.register(self.cancel) for token in linked_tokens if token]
+        if timeout is not None:
+            self.cancel_after(timeout)
 
     @property
     def token(self) -> CancellationToken:
         return self._token
 
     def cancel(self) -> None:
-        self._token._cancelled = True  # pyright: ignore [reportPrivateUsage] # noqa: SLF001
+        self._token._cancel()  # pyright: ignore [reportPrivateUsage] # noqa: SLF001
+
+    def cancel_after(self, delay: float) -> None:
+        """Cancel the token after `delay` seconds, replacing any earlier deadline."""
+        if self._timer:
+            self._timer.cancel()
+        self._timer = threading.Timer(delay, self.cancel)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def close(self) -> None:
+        """Detach the source from its linked tokens and its deadline, without cancelling the token."""
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        for unregister_callback in self._unregister_callbacks:
+            unregister_callback()
+        self._unregister_callbacks.clear()
 
 
 class CancellationToken:
+    """A cancellation flag built on an event, so it can be waited for instead of polled."""
+
     def __init__(self) -> None:
-        self._cancelled = False
+        self._event = threading.Event()
+        self._callbacks: list[Callable[[], object]] = []
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
 
     def check(self) -> None:
-        if self._cancelled:
+        if self._event.is_set():
             raise Cancelled
 
+    def wait(self, timeout: float | None = None) -> bool:
+        """Block until the token is cancelled or `timeout` seconds have passed, returning whether it was cancelled."""
+        return self._event.wait(timeout)
+
+    def register(self, callback: Callable[[], object]) -> Callable[[], None]:
+        """Call `callback` once the token is cancelled, right away if it already is.
+
+        The callback runs on the thread that cancels the token. Returns a function that unregisters it.
+        """
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return lambda: self._unregister(callback)
+        callback()
+        return lambda: None
+
+    def _unregister(self, callback: Callable[[], object]) -> None:
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    def _cancel(self) -> None:
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                logging.exception("A cancellation callback failed.")
+
 
 class Cancelled(Exception):  # noqa: N818
     pass
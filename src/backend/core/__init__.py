@@ -3,5 +3,13 @@ from __future__ import annotations
 from .architecture import Architecture, UnavailableArchitectureError
 from .instance import Instance
 from .version import Version
+from .versioncatalog import VersionCatalog, VersionCatalogDiff
 
-__all__ = "Architecture", "Instance", "UnavailableArchitectureError", "Version"
+__all__ = (
+    "Architecture",
+    "Instance",
+    "UnavailableArchitectureError",
+    "Version",
+    "VersionCatalog",
+    "VersionCatalogDiff",
+)
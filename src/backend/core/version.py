@@ -1,49 +1,43 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import StrEnum, auto
 from typing import TYPE_CHECKING
 
 from ordered_set import OrderedSet
 
 from backend import packagemanager
+from backend.packagestore import PackageStore
 
 from . import UnavailableArchitectureError
 
 if TYPE_CHECKING:
     from collections.abc import Mapping, Sequence
-    from pathlib import Path
 
     from . import Architecture
 
 
 @dataclass(frozen=True, slots=True)
 class Version:
+    """A version of the game.
+
+    The fields derived from the name and the GUIDs are computed once, when the version is created.
+    """
+
     name: str
     type: Type
     architecture_to_guids: Mapping[Architecture, Sequence[str]]
-    architecture_to_package: Mapping[Architecture, Path]
+    display_name: str = field(init=False, repr=False, compare=False)
+    available_architectures: OrderedSet[Architecture] = field(init=False, repr=False, compare=False)
 
     class Type(StrEnum):
         RELEASE = auto()
         BETA = auto()
         PREVIEW = auto()
 
-    @property
-    def display_name(self) -> str:
-        if self.type != self.Type.RELEASE:
-            return self.name
-
-        major_version, minor_version, patch, *_ = self.name.split(".")
-        return (
-            f"{major_version}.{minor_version[:2]}.{minor_version[2:].lstrip("0") or "0"}"
-            if major_version == "0"
-            else f"{major_version}.{minor_version}.{patch[:-2] or "0"}"
-        )
-
-    @property
-    def available_architectures(self) -> OrderedSet[Architecture]:
-        return OrderedSet(self.architecture_to_guids.keys())
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "display_name", self._get_display_name())
+        object.__setattr__(self, "available_architectures", OrderedSet(self.architecture_to_guids.keys()))
 
     @property
     def pfn(self) -> str:
@@ -61,18 +55,27 @@ class Version:
             self.Type.PREVIEW: "S-1-15-2-424268864-5579737-879501358-346833251-474568803-887069379-4040235476",
         }[self.type]
 
+    def _get_display_name(self) -> str:
+        if self.type != self.Type.RELEASE:
+            return self.name
+
+        major_version, minor_version, patch, *_ = self.name.split(".")
+        return (
+            f"{major_version}.{minor_version[:2]}.{minor_version[2:].lstrip("0") or "0"}"
+            if major_version == "0"
+            else f"{major_version}.{minor_version}.{patch[:-2] or "0"}"
+        )
+
     def is_downloaded(self, architecture: Architecture) -> bool:
-        try:
-            package = self.architecture_to_package[architecture]
-        except KeyError:
-            raise UnavailableArchitectureError from None
-        return package.is_file()
+        if architecture not in self.available_architectures:
+            raise UnavailableArchitectureError
+        return PackageStore.get_package(self.name, architecture) is not None
 
     def is_installed(self, architecture: Architecture) -> bool:
+        return self.get_package_full_name(architecture) in packagemanager.find_packages(self.pfn)
+
+    def get_package_full_name(self, architecture: Architecture) -> str:
         if architecture not in self.available_architectures:
             raise UnavailableArchitectureError
-        package_dicts = packagemanager.find_packages(self.pfn)
-        if not package_dicts:
-            return False
         name, publisher_id = self.pfn.split("_")
-        return package_dicts[0]["PackageFullName"] == f"{name}_{self.name}_{architecture}__{publisher_id}"
+        return f"{name}_{self.name}_{architecture}__{publisher_id}"
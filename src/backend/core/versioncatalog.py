@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from .version import Version
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+
+
+class VersionCatalog:
+    """The known versions, indexed by name, display name and type, and searchable by display name.
+
+    The versions keep the order they are given in, which for the version list is the reverse of the source's, newest
+    first. Every index is built once, when the catalog is created.
+    """
+
+    def __init__(self, versions: Iterable[Version] = ()) -> None:
+        self._versions = tuple(versions)
+        self._name_to_version: dict[str, Version] = {}
+        self._display_name_to_version: dict[str, Version] = {}
+        self._search_keys = tuple(version.display_name.casefold() for version in self._versions)
+        type_to_versions: dict[Version.Type, list[Version]] = {version_type: [] for version_type in Version.Type}
+        type_to_search_keys: dict[Version.Type, list[str]] = {version_type: [] for version_type in Version.Type}
+        for version, search_key in zip(self._versions, self._search_keys, strict=True):
+            self._name_to_version.setdefault(version.name, version)
+            self._display_name_to_version.setdefault(version.display_name, version)
+            type_to_versions[version.type].append(version)
+            type_to_search_keys[version.type].append(search_key)
+        self._type_to_versions = {version_type: tuple(versions) for version_type, versions in type_to_versions.items()}
+        self._type_to_search_keys = {version_type: tuple(keys) for version_type, keys in type_to_search_keys.items()}
+
+    def __iter__(self) -> Iterator[Version]:
+        return iter(self._versions)
+
+    def __len__(self) -> int:
+        return len(self._versions)
+
+    def __contains__(self, version: object) -> bool:
+        return isinstance(version, Version) and self._name_to_version.get(version.name) == version
+
+    def get(self, name: str) -> Version | None:
+        return self._name_to_version.get(name)
+
+    def get_by_display_name(self, display_name: str) -> Version | None:
+        return self._display_name_to_version.get(display_name)
+
+    def get_versions_of_type(self, version_type: Version.Type) -> tuple[Version, ...]:
+        return self._type_to_versions[version_type]
+
+    def search(self, text: str, version_type: Version.Type | None = None) -> tuple[Version, ...]:
+        """Return the versions whose display name contains `text`, ignoring case, those that start with it first.
+
+        The versions are limited to `version_type` if it is given and are otherwise kept in order.
+        """
+        if version_type is None:
+            versions, search_keys = self._versions, self._search_keys
+        else:
+            versions, search_keys = self._type_to_versions[version_type], self._type_to_search_keys[version_type]
+        if not text:
+            return versions
+
+        text = text.casefold()
+        prefix_matches: list[Version] = []
+        other_matches: list[Version] = []
+        for search_key, version in zip(search_keys, versions, strict=True):
+            index = search_key.find(text)
+            if index == 0:
+                prefix_matches.append(version)
+            elif index > 0:
+                other_matches.append(version)
+        return (*prefix_matches, *other_matches)
+
+    def diff(self, new_catalog: VersionCatalog) -> VersionCatalogDiff:
+        """Compare the catalog to `new_catalog`, matching versions by name."""
+        return VersionCatalogDiff(
+            tuple(version for version in new_catalog if version.name not in self._name_to_version),
+            tuple(version for version in self if new_catalog.get(version.name) is None),
+            tuple(
+                (old_version, new_version)
+                for new_version in new_catalog
+                if (old_version := self.get(new_version.name)) is not None and old_version != new_version
+            ),
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class VersionCatalogDiff:
+    """The changes between two catalogs.
+
+    `changed` holds pairs of the old and the new state of versions whose type or GUIDs have changed.
+    """
+
+    added: tuple[Version, ...]
+    removed: tuple[Version, ...]
+    changed: tuple[tuple[Version, Version], ...]
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.changed)
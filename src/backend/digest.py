@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import hashlib
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+    from pathlib import Path
+
+    from .cancellationtoken import CancellationToken
+
+
+CHUNK_SIZE = 8 * 1024 * 1024
+"""The size of the chunks a file is hashed in.
+
+The digest of a file is the SHA-256 of the concatenated SHA-256 digests of its chunks, so the chunks can be hashed
+independently and in any order while they are being written.
+"""
+
+
+def combine(chunk_digests: Iterable[bytes]) -> str:
+    hasher = hashlib.sha256()
+    for chunk_digest in chunk_digests:
+        hasher.update(chunk_digest)
+    return hasher.hexdigest()
+
+
+def hash_file(file: Path, cancellation_token: CancellationToken | None = None) -> str:
+    chunk_digests: list[bytes] = []
+    with file.open("rb") as f:
+        while chunk := f.read(CHUNK_SIZE):
+            if cancellation_token:
+                cancellation_token.check()
+            chunk_digests.append(hashlib.sha256(chunk).digest())
+    return combine(chunk_digests)
+
+
+class StreamHasher:
+    """Hashes data that arrives in order, such as a single-connection download."""
+
+    def __init__(self) -> None:
+        self._chunk_digests: list[bytes] = []
+        self._chunk_hasher = hashlib.sha256()
+        self._chunk_remaining = CHUNK_SIZE
+
+    def update(self, data: bytes) -> None:
+        view = memoryview(data)
+        while len(view) >= self._chunk_remaining:
+            self._chunk_hasher.update(view[: self._chunk_remaining])
+            view = view[self._chunk_remaining :]
+            self._chunk_digests.append(self._chunk_hasher.digest())
+            self._chunk_hasher = hashlib.sha256()
+            self._chunk_remaining = CHUNK_SIZE
+        if view:
+            self._chunk_hasher.update(view)
+            self._chunk_remaining -= len(view)
+
+    def hexdigest(self) -> str:
+        if self._chunk_remaining == CHUNK_SIZE:
+            return combine(self._chunk_digests)
+        return combine((*self._chunk_digests, self._chunk_hasher.digest()))
@@ -6,15 +6,23 @@ from typing import TYPE_CHECKING
 from backend import packagemanager, utility
 from backend.cancellationtoken import CancellationTokenSource, Cancelled
 from backend.report import Report
+from backend.tracing import Tracer
 
+from . import accessgrant as _accessgrant
+from . import pipeline as _pipeline
 from . import step as _step
-from .download import download_version
+from .downloadmanager import DownloadJob, DownloadManager
+from .linkcache import LinkCache
+from .prewarmer import Prewarmer
 
 if TYPE_CHECKING:
     from collections.abc import Callable
 
+    from backend.cancellationtoken import CancellationToken
     from backend.core import Instance
 
+__all__ = "DownloadJob", "DownloadManager", "Game", "LinkCache", "Prewarmer"
+
 
 @utility.typed_namespace
 class Game:
@@ -32,42 +40,67 @@ class Game:
 
         self._cancellation_token_source = CancellationTokenSource()
         self._launched_instance = instance
+        # The pre-warming would otherwise compete with the launch, which picks up its download job if it has one.
+        Prewarmer.cancel()
 
         logging.info('Launching instance "%s" at "%s"...', instance.name, instance.directory)
         if reporthook:
             reporthook(Report(Report.Type.PROGRESS, "Checking game files..."))
         try:
-            _step.grant_access(instance.directory / "com.mojang", instance.version.user_sid)
-
-            if not instance.version.is_downloaded(instance.architecture_choice):
-                logging.info("Downloading Minecraft %s...", instance.version.name)
-                download_version(
-                    instance.version,
-                    instance.architecture_choice,
-                    self._cancellation_token_source.token,
-                    reporthook,
-                )
-
-            if not instance.version.is_installed(instance.architecture_choice):
-                _step.install(
-                    instance.version,
-                    instance.architecture_choice,
-                    self._cancellation_token_source.token,
-                    reporthook,
-                )
-
-            _step.relink_game_files(instance, self._cancellation_token_source.token)
-
-            logging.info("Launching Minecraft %s...", instance.version.name)
-            if reporthook:
-                reporthook(Report(Report.Type.PROGRESS, "Launching Minecraft..."))
-            packagemanager.launch_package(instance.version.pfn, "App", self._cancellation_token_source.token)
+            with Tracer.span(
+                "launch",
+                "launch",
+                instance=instance.name,
+                version=instance.version.name,
+                architecture=instance.architecture_choice,
+            ):
+                self._run_steps(instance, self._cancellation_token_source.token, reporthook)
         except Cancelled:
             pass
         finally:
             self._cancellation_token_source = None
             self._launched_instance = None
 
+    @staticmethod
+    def _run_steps(
+        instance: Instance,
+        cancellation_token: CancellationToken,
+        reporthook: Callable[[Report], object] | None = None,
+    ) -> None:
+        version = instance.version
+        architecture = instance.architecture_choice
+
+        def download(cancellation_token: CancellationToken, reporthook: Callable[[Report], object]) -> None:
+            if not version.is_downloaded(architecture):
+                logging.info("Downloading Minecraft %s...", version.name)
+                DownloadManager.download(version, architecture, cancellation_token, reporthook)
+
+        def install(cancellation_token: CancellationToken, reporthook: Callable[[Report], object]) -> None:
+            if not version.is_installed(architecture):
+                _step.install(version, architecture, cancellation_token, reporthook)
+
+        def launch(cancellation_token: CancellationToken, reporthook: Callable[[Report], object]) -> None:
+            logging.info("Launching Minecraft %s...", version.name)
+            reporthook(Report(Report.Type.PROGRESS, "Launching Minecraft..."))
+            packagemanager.launch_package(version.pfn, "App", cancellation_token)
+
+        # The steps are listed in the order in which their reports take precedence while they run at the same time.
+        _pipeline.run_pipeline(
+            (
+                _pipeline.Step("download", download),
+                _pipeline.Step("grant_access", lambda token, hook: _step.grant_access(instance, token, hook)),
+                _pipeline.Step("install", install, ("download",)),
+                _pipeline.Step("relink", lambda token, _: _step.relink_game_files(instance, token), ("install",)),
+                _pipeline.Step("launch_package", launch, ("grant_access", "relink")),
+            ),
+            cancellation_token,
+            reporthook,
+        )
+
+    def reset_access_grants(self, instance: Instance) -> None:
+        """Make the next launch of the instance grant access to its whole game directory again."""
+        _accessgrant.forget(_step.get_access_record_file(instance))
+
     def cancel_launch(self) -> None:
         if not self._cancellation_token_source:
             error_msg = "Nothing is being launched."
@@ -0,0 +1,107 @@
+"""Granting the game access to the files of an instance without re-stamping the whole tree on every launch.
+
+Once a directory has been granted access with an inheritable entry, everything created inside it inherits the entry.
+Only directories that arrive with their own permissions, such as a world moved in from elsewhere, need a grant of their
+own. The directories of the tree are therefore recorded after a grant, and the next grant only covers the subtrees
+that have appeared since. New files are left to inheritance, since every recorded directory has been granted access,
+so the many files the game writes to its worlds don't each need a grant. The whole tree is granted again when there
+is no record, when the record is for another SID or when a full grant is forced.
+"""
+
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Literal
+
+from pydantic import BaseModel, ValidationError
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from pathlib import Path
+
+    from backend.cancellationtoken import CancellationToken
+
+
+@dataclass(frozen=True, slots=True)
+class Grant:
+    path: Path
+
+
+def grant_access(  # noqa: PLR0913
+    directory: Path,
+    user_sid: str,
+    record_file: Path,
+    apply: Callable[[Grant], object],
+    force: bool = False,
+    cancellation_token: CancellationToken | None = None,
+) -> tuple[Grant, ...]:
+    """Grant `user_sid` access to what has appeared in `directory` since the last grant, returning the grants applied.
+
+    `apply` applies a single grant, which has to give an inheritable entry to the directory and all of its contents.
+    """
+    recorded_tree = None if force else _load_tree(record_file, user_sid)
+    tree = _scan(directory, cancellation_token)
+    grants = (Grant(directory),) if recorded_tree is None else _diff(directory, recorded_tree, tree)
+    for grant in grants:
+        if cancellation_token:
+            cancellation_token.check()
+        apply(grant)
+    # The scan happened before the grants, so anything created in the meantime is picked up by the next grant.
+    if tree != recorded_tree:
+        _save_tree(record_file, user_sid, tree)
+    return grants
+
+
+def forget(record_file: Path) -> None:
+    """Make the next grant cover the whole tree."""
+    record_file.unlink(missing_ok=True)
+
+
+def _scan(directory: Path, cancellation_token: CancellationToken | None) -> dict[str, list[str]]:
+    """Map the path of every directory in the tree, relative to `directory` and with forward slashes, to its names."""
+    tree: dict[str, list[str]] = {}
+    pending = [""]
+    while pending:
+        if cancellation_token:
+            cancellation_token.check()
+        relative_path = pending.pop()
+        names: list[str] = []
+        with os.scandir(directory / relative_path) as entries:
+            for entry in entries:
+                names.append(entry.name)
+                if entry.is_dir(follow_symlinks=False):
+                    pending.append(f"{relative_path}/{entry.name}" if relative_path else entry.name)
+        tree[relative_path] = sorted(names)
+    return tree
+
+
+def _diff(directory: Path, recorded_tree: dict[str, list[str]], tree: dict[str, list[str]]) -> tuple[Grant, ...]:
+    # Only the topmost new directory needs a grant, since its grant covers its subtree.
+    return tuple(
+        Grant(directory / relative_path)
+        for relative_path in tree
+        if relative_path not in recorded_tree and relative_path.rpartition("/")[0] in recorded_tree
+    )
+
+
+class _RecordModel(BaseModel):
+    format_version: Literal[1]
+    user_sid: str
+    tree: dict[str, list[str]]
+
+
+def _load_tree(record_file: Path, user_sid: str) -> dict[str, list[str]] | None:
+    try:
+        with record_file.open() as f:
+            record_model = _RecordModel.model_validate_json(f.read(), strict=True)
+    except (OSError, ValidationError):
+        return None
+    return record_model.tree if record_model.user_sid == user_sid else None
+
+
+def _save_tree(record_file: Path, user_sid: str, tree: dict[str, list[str]]) -> None:
+    temp_file = record_file.with_name(record_file.name + ".tmp")
+    with temp_file.open("w") as f:
+        f.write(_RecordModel(format_version=1, user_sid=user_sid, tree=tree).model_dump_json())
+    temp_file.replace(record_file)
@@ -1,15 +1,24 @@
 from __future__ import annotations
 
 import logging
-import secrets
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from typing import TYPE_CHECKING
 from xml.etree.ElementTree import Element, SubElement
 
 from backend import net
+from backend.cancellationtoken import CancellationTokenSource, Cancelled
+from backend.packagestore import PackageStore
 from backend.report import Report
 
+from .linkcache import LinkCache
+
 if TYPE_CHECKING:
-    from collections.abc import Callable
+    from collections.abc import Callable, Sequence
+    from concurrent.futures import Future
+    from pathlib import Path
 
     from backend.cancellationtoken import CancellationToken
     from backend.core import Architecture, Version
@@ -24,45 +33,165 @@ def download_version(
     if cancellation_token:
         cancellation_token.check()
 
+    staging_file = PackageStore.get_staging_file(version.name, architecture)
+    guids = version.architecture_to_guids[architecture]
+
+    if links := net.get_partial_download_urls(staging_file):
+        logging.debug('Resuming the download of the package to "%s"...', staging_file)
+        if file_digest := _try_download(links, staging_file, cancellation_token, reporthook):
+            PackageStore.add_package(version.name, architecture, staging_file, file_digest)
+            return
+        LinkCache.invalidate_urls(links)
+
+    if cached_links := LinkCache.get(guids):
+        guid, links = cached_links
+        logging.debug('Downloading package to "%s" using a cached link...', staging_file)
+        if file_digest := _try_download(links, staging_file, cancellation_token, reporthook):
+            PackageStore.add_package(version.name, architecture, staging_file, file_digest)
+            return
+        LinkCache.invalidate((guid,))
+
     msg = "Retrieving download link..."
     logging.debug(msg)
     if reporthook:
         reporthook(Report(Report.Type.PROGRESS, msg))
-    link = _get_link(secrets.choice(version.architecture_to_guids[architecture]))
-    if not link:
+    resolved_links = _resolve_links(guids, cancellation_token)
+    if not resolved_links:
         error_msg = "Couldn't retrieve a download link."
         logging.error(error_msg)
         raise LinkRetrievalError(error_msg)
+    guid, links = resolved_links
+    LinkCache.put(guid, links)
 
     if cancellation_token:
         cancellation_token.check()
 
-    logging.debug('Downloading package to "%s"...', version.architecture_to_package[architecture])
-    net.download_file(link, version.architecture_to_package[architecture], cancellation_token, reporthook)
+    logging.debug('Downloading package to "%s"...', staging_file)
+    try:
+        file_digest = net.download_file(links, staging_file, cancellation_token, reporthook)
+    except net.LinkExpiredError:
+        LinkCache.invalidate((guid,))
+        raise
+    PackageStore.add_package(version.name, architecture, staging_file, file_digest)
 
 
 class LinkRetrievalError(Exception):
     pass
 
 
-def _get_link(guid: str) -> str:
+def _try_download(
+    links: Sequence[str],
+    staging_file: Path,
+    cancellation_token: CancellationToken | None = None,
+    reporthook: Callable[[Report], object] | None = None,
+) -> str | None:
+    """Download with links resolved earlier, returning `None` if the download fails with them.
+
+    Links that have gone stale can fail in other ways than by expiring, such as with server errors, so any failure
+    lets the caller resolve fresh links once. The data fetched so far is kept for the next attempt.
+    """
+    try:
+        return net.download_file(links, staging_file, cancellation_token, reporthook)
+    except net.DownloadError as e:
+        logging.debug("Couldn't download with the links resolved earlier: %s", e)
+        return None
+
+
+_HEDGE_DELAY = 1.5
+_FAILURE_MEMORY_DURATION = 30 * 60
+
+# Shared by the downloads that resolve links at the same time.
+_guid_to_failure_time: dict[str, float] = {}
+_guid_to_failure_time_lock = threading.Lock()
+
+
+def _resolve_links(
+    guids: Sequence[str],
+    cancellation_token: CancellationToken | None = None,
+) -> tuple[str, tuple[str, ...]] | None:
+    """Request links for several GUIDs with staggered starts and return the first non-empty result with its GUID.
+
+    A new request is started every `_HEDGE_DELAY` seconds, or as soon as all running ones have failed. GUIDs that
+    failed recently are tried last. Requests still running when a result arrives are cancelled, which aborts their
+    responses.
+    """
+    pending_guids = _order_guids(guids)
+    future_to_guid: dict[Future[tuple[str, ...]], str] = {}
+    executor = ThreadPoolExecutor(len(pending_guids), "LinkResolution")
+    stop_source = CancellationTokenSource(cancellation_token)
+    try:
+        next_start_time = time.monotonic()
+        while True:
+            running_futures = [future for future in future_to_guid if not future.done()]
+            now = time.monotonic()
+            if pending_guids and (not running_futures or now >= next_start_time):
+                guid = pending_guids.pop(0)
+                running_futures.append(future := executor.submit(_get_links, guid, stop_source.token))
+                future_to_guid[future] = guid
+                next_start_time = now + _HEDGE_DELAY
+            if not running_futures:
+                return None
+
+            wait(running_futures, max(min(next_start_time - now, 0.1), 0) if pending_guids else 0.1, FIRST_COMPLETED)
+            if cancellation_token:
+                cancellation_token.check()
+            for future in [future for future in future_to_guid if future.done()]:
+                guid = future_to_guid.pop(future)
+                try:
+                    links = future.result()
+                except Cancelled:
+                    raise
+                except Exception as e:  # noqa: BLE001
+                    logging.warning('Couldn\'t retrieve a download link for "%s": %s', guid, e)
+                    links = ()
+                with _guid_to_failure_time_lock:
+                    if links:
+                        _guid_to_failure_time.pop(guid, None)
+                        return guid, links
+                    _guid_to_failure_time[guid] = time.monotonic()
+    finally:
+        stop_source.cancel()
+        stop_source.close()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _order_guids(guids: Sequence[str]) -> list[str]:
+    now = time.monotonic()
+    with _guid_to_failure_time_lock:
+        for guid, failure_time in list(_guid_to_failure_time.items()):
+            if now - failure_time >= _FAILURE_MEMORY_DURATION:
+                del _guid_to_failure_time[guid]
+        healthy_guids = [guid for guid in guids if guid not in _guid_to_failure_time]
+        recently_failed_guids = sorted(
+            (guid for guid in guids if guid in _guid_to_failure_time),
+            key=_guid_to_failure_time.__getitem__,
+        )
+    random.shuffle(healthy_guids)
+    return healthy_guids + recently_failed_guids
+
+
+def _get_links(guid: str, cancellation_token: CancellationToken | None = None) -> tuple[str, ...]:
     secured_url = "https://fe3.delivery.mp.microsoft.com/ClientWebService/client.asmx/secured"
     envelope = _build_link_request_envelope(secured_url, guid)
-    response_envelope = net.soap.post_envelope(secured_url, envelope)
-    return _extract_link(response_envelope)
+    # Every package URL of the response is returned. They all point to the same file and are used as mirrors.
+    return tuple(
+        url
+        for file_location in net.soap.iter_response_elements(
+            secured_url,
+            envelope,
+            _FILE_LOCATION_PATH,
+            cancellation_token,
+        )
+        if (url := file_location.findtext("./{*}Url")) and url.startswith("http://tlu.dl.delivery.mp.microsoft.com/")
+    )
 
 
-def _extract_link(response_envelope: Element) -> str:
-    file_locations = response_envelope.find(
-        "./{*}Body/{*}GetExtendedUpdateInfo2Response/{*}GetExtendedUpdateInfo2Result/{*}FileLocations",
-    )
-    if file_locations is None:
-        return ""
-    for file_location in file_locations:
-        url = file_location.findtext("./{*}Url")
-        if url and url.startswith("http://tlu.dl.delivery.mp.microsoft.com/"):
-            return url
-    return ""
+_FILE_LOCATION_PATH = (
+    "GetExtendedUpdateInfo2Response",
+    "GetExtendedUpdateInfo2Result",
+    "FileLocations",
+    "FileLocation",
+)
 
 
 def _build_link_request_envelope(url: str, guid: str) -> net.soap.Envelope:
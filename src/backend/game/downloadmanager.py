@@ -0,0 +1,284 @@
+from __future__ import annotations
+
+import logging
+import threading
+from enum import IntEnum, StrEnum, auto
+from typing import TYPE_CHECKING
+
+from backend import utility
+from backend.cancellationtoken import CancellationTokenSource, Cancelled
+from backend.tracing import Tracer
+
+from .download import download_version
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from backend.cancellationtoken import CancellationToken
+    from backend.core import Architecture, Version
+    from backend.report import Report
+    from backend.tracing import Span
+
+
+class DownloadJob:
+    class Priority(IntEnum):
+        INTERACTIVE = auto()
+        BACKGROUND = auto()
+
+    class State(StrEnum):
+        QUEUED = auto()
+        RUNNING = auto()
+        FINISHED = auto()
+        FAILED = auto()
+        CANCELLED = auto()
+
+    def __init__(self, version: Version, architecture: Architecture, priority: Priority) -> None:
+        self._version = version
+        self._architecture = architecture
+        self.priority = priority
+        self.state = self.State.QUEUED
+        self.preempted = False
+        self.cancellation_token_source = CancellationTokenSource()
+        # The span that the spans of the download become children of, such as the launch step that needs the package.
+        self.trace_parent: Span | None = None
+        self._report: Report | None = None
+        self._error: Exception | None = None
+        self._subscribers: list[Callable[[Report], object]] = []
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+        self._condition = threading.Condition(self._lock)
+
+    @property
+    def version(self) -> Version:
+        return self._version
+
+    @property
+    def architecture(self) -> Architecture:
+        return self._architecture
+
+    @property
+    def report(self) -> Report | None:
+        """The latest report of the download."""
+        return self._report
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def wait(
+        self,
+        cancellation_token: CancellationToken | None = None,
+        reporthook: Callable[[Report], object] | None = None,
+    ) -> None:
+        """Block until the job is done, forwarding its reports to `reporthook` in the meantime.
+
+        Raises the exception the download failed with, or `Cancelled` if the job was cancelled.
+        """
+        if reporthook:
+            with self._lock:
+                self._subscribers.append(reporthook)
+            if self._report:
+                reporthook(self._report)
+        unregister_callback = cancellation_token.register(self._wake_waiters) if cancellation_token else None
+        try:
+            with self._condition:
+                while not self._done.is_set():
+                    if cancellation_token:
+                        cancellation_token.check()
+                    self._condition.wait()
+        finally:
+            if unregister_callback:
+                unregister_callback()
+            if reporthook:
+                with self._lock:
+                    self._subscribers.remove(reporthook)
+
+        if self._error:
+            raise self._error
+        if self.state == self.State.CANCELLED:
+            raise Cancelled
+
+    def propel_report(self, report: Report) -> None:
+        self._report = report
+        with self._lock:
+            subscribers = tuple(self._subscribers)
+        for subscriber in subscribers:
+            subscriber(report)
+
+    def finish(self, state: State, error: Exception | None = None) -> None:
+        self.state = state
+        self._error = error
+        self._done.set()
+        self._wake_waiters()
+
+    def _wake_waiters(self) -> None:
+        with self._condition:
+            self._condition.notify_all()
+
+
+@utility.typed_namespace
+class DownloadManager:
+    """Runs package downloads in the background, a limited number at a time.
+
+    Queued jobs start in priority order. An interactive job that finds every slot taken preempts a running background
+    job, which goes back to the queue; since downloads are resumable, it later continues where it stopped.
+    """
+
+    MAX_CONCURRENT_DOWNLOADS = 2
+
+    def __init__(self) -> None:
+        self._queue: list[DownloadJob] = []
+        self._running: list[DownloadJob] = []
+        self._lock = threading.RLock()
+
+    @property
+    def jobs(self) -> tuple[DownloadJob, ...]:
+        with self._lock:
+            return (*self._running, *self._queue)
+
+    def get_job(self, version: Version, architecture: Architecture) -> DownloadJob | None:
+        with self._lock:
+            return next(
+                (job for job in self.jobs if (job.version.name, job.architecture) == (version.name, architecture)),
+                None,
+            )
+
+    def enqueue(
+        self,
+        version: Version,
+        architecture: Architecture,
+        priority: DownloadJob.Priority = DownloadJob.Priority.BACKGROUND,
+    ) -> DownloadJob:
+        """Queue a download, or return the job that is already downloading the package with its priority raised."""
+        with self._lock:
+            job = self.get_job(version, architecture)
+            if job:
+                if priority < job.priority:
+                    self.set_priority(job, priority)
+                return job
+
+            job = DownloadJob(version, architecture, priority)
+            job.trace_parent = Tracer.current_span
+            self._insert(job)
+            logging.debug("Queued the download of Minecraft %s (%s).", version.name, architecture)
+            self._schedule()
+            return job
+
+    def download(
+        self,
+        version: Version,
+        architecture: Architecture,
+        cancellation_token: CancellationToken | None = None,
+        reporthook: Callable[[Report], object] | None = None,
+    ) -> None:
+        """Download a package interactively, attaching to the job that is already downloading it if there is one.
+
+        If `cancellation_token` is cancelled, a job started by this call is cancelled, while a job that already existed
+        gets its previous priority back.
+        """
+        with self._lock:
+            existing_job = self.get_job(version, architecture)
+            previous_priority = existing_job.priority if existing_job else None
+            job = self.enqueue(version, architecture, DownloadJob.Priority.INTERACTIVE)
+            # A job that has started already keeps the parent it started with.
+            if job.trace_parent is None:
+                job.trace_parent = Tracer.current_span
+        try:
+            job.wait(cancellation_token, reporthook)
+        except Cancelled:
+            if not job.done:
+                if previous_priority is None:
+                    self.cancel(job)
+                else:
+                    self.set_priority(job, previous_priority)
+            raise
+
+    def move(self, position: int, job: DownloadJob) -> None:
+        """Move a queued job to `position` among the queued jobs of the same priority."""
+        with self._lock:
+            if job not in self._queue:
+                return
+            self._queue.remove(job)
+            same_priority_indices = [i for i, other in enumerate(self._queue) if other.priority == job.priority]
+            if not same_priority_indices:
+                self._insert(job)
+                return
+            position = max(0, min(position, len(same_priority_indices)))
+            self._queue.insert(
+                same_priority_indices[position]
+                if position < len(same_priority_indices)
+                else same_priority_indices[-1] + 1,
+                job,
+            )
+
+    def set_priority(self, job: DownloadJob, priority: DownloadJob.Priority) -> None:
+        with self._lock:
+            job.priority = priority
+            if job in self._queue:
+                self._queue.remove(job)
+                self._insert(job)
+                self._schedule()
+
+    def cancel(self, job: DownloadJob) -> None:
+        with self._lock:
+            if job in self._queue:
+                self._queue.remove(job)
+                job.finish(DownloadJob.State.CANCELLED)
+            elif job in self._running:
+                job.preempted = False
+                job.cancellation_token_source.cancel()
+
+    def _insert(self, job: DownloadJob) -> None:
+        index = next((i for i, other in enumerate(self._queue) if other.priority > job.priority), len(self._queue))
+        self._queue.insert(index, job)
+
+    def _schedule(self) -> None:
+        while self._queue:
+            job = self._queue[0]
+            if len(self._running) >= self.MAX_CONCURRENT_DOWNLOADS:
+                preemptible_jobs = [other for other in self._running if other.priority > job.priority]
+                if not preemptible_jobs or any(other.preempted for other in self._running):
+                    return
+                preempted_job = preemptible_jobs[-1]
+                logging.debug("Preempting the download of Minecraft %s.", preempted_job.version.name)
+                preempted_job.preempted = True
+                preempted_job.cancellation_token_source.cancel()
+                return
+
+            self._queue.remove(job)
+            self._running.append(job)
+            job.state = DownloadJob.State.RUNNING
+            threading.Thread(target=self._run, args=(job,), name="Download", daemon=True).start()
+
+    def _run(self, job: DownloadJob) -> None:
+        try:
+            with Tracer.continue_span(job.trace_parent):
+                if not job.version.is_downloaded(job.architecture):
+                    download_version(
+                        job.version,
+                        job.architecture,
+                        job.cancellation_token_source.token,
+                        job.propel_report,
+                    )
+        except Cancelled:
+            with self._lock:
+                self._running.remove(job)
+                if job.preempted:
+                    job.preempted = False
+                    job.state = DownloadJob.State.QUEUED
+                    job.cancellation_token_source = CancellationTokenSource()
+                    self._insert(job)
+                else:
+                    job.finish(DownloadJob.State.CANCELLED)
+                self._schedule()
+        except Exception as e:
+            logging.exception("Couldn't download Minecraft %s.", job.version.name)
+            with self._lock:
+                self._running.remove(job)
+                job.finish(DownloadJob.State.FAILED, e)
+                self._schedule()
+        else:
+            with self._lock:
+                self._running.remove(job)
+                job.finish(DownloadJob.State.FINISHED)
+                self._schedule()
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import TYPE_CHECKING, Literal
+from urllib.parse import parse_qs, urlsplit
+
+from pydantic import BaseModel, ValidationError
+
+from backend import utility
+from backend.versionretriever import VersionRetriever
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Sequence
+
+    from backend.core import VersionCatalogDiff
+
+
+@utility.typed_namespace
+class LinkCache:
+    """Download links resolved through the delivery service, keyed by GUID and kept until they expire.
+
+    The expiry of a link is taken from its signed `P1` parameter, minus a margin that leaves time to finish a download.
+    Links without one are kept for a conservative fixed duration. Links of versions that are removed from the version
+    list or whose GUIDs change are dropped.
+    """
+
+    _FILE = VersionRetriever.DIRECTORY / "links.json"
+    _DEFAULT_TTL = 10 * 60
+    _EXPIRY_MARGIN = 15 * 60
+
+    def __init__(self) -> None:
+        self._entries: dict[str, _EntryModel] | None = None
+        self._hits = 0
+        self._misses = 0
+        self._lock = threading.Lock()
+        VersionRetriever.subscribe_to_change(self._on_version_catalog_change)
+
+    @property
+    def hits(self) -> int:
+        return self._hits
+
+    @property
+    def misses(self) -> int:
+        return self._misses
+
+    def get(self, guids: Sequence[str]) -> tuple[str, tuple[str, ...]] | None:
+        """Return the first of `guids` that has valid links cached, together with the links."""
+        with self._lock:
+            entries = self._get_entries()
+            now = time.time()
+            for guid in guids:
+                entry = entries.get(guid)
+                if entry and entry.expires > now:
+                    self._hits += 1
+                    logging.debug("Link cache hit (%s hits, %s misses).", self._hits, self._misses)
+                    return guid, tuple(entry.urls)
+            self._misses += 1
+            logging.debug("Link cache miss (%s hits, %s misses).", self._hits, self._misses)
+            return None
+
+    def put(self, guid: str, urls: Sequence[str]) -> None:
+        with self._lock:
+            self._get_entries()[guid] = _EntryModel(urls=list(urls), expires=self._get_expiry(urls))
+            self._save()
+
+    def invalidate(self, guids: Iterable[str]) -> None:
+        with self._lock:
+            entries = self._get_entries()
+            invalidated_guids = [guid for guid in guids if guid in entries]
+            if not invalidated_guids:
+                return
+            for guid in invalidated_guids:
+                del entries[guid]
+            self._save()
+
+    def invalidate_urls(self, urls: Iterable[str]) -> None:
+        urls = frozenset(urls)
+        with self._lock:
+            guids = [guid for guid, entry in self._get_entries().items() if urls.intersection(entry.urls)]
+        self.invalidate(guids)
+
+    def _on_version_catalog_change(self, diff: VersionCatalogDiff) -> None:
+        self.invalidate(
+            guid
+            for version in (*diff.removed, *(old_version for old_version, _ in diff.changed))
+            for guids in version.architecture_to_guids.values()
+            for guid in guids
+        )
+
+    def _get_expiry(self, urls: Sequence[str]) -> float:
+        now = time.time()
+        expiries: list[float] = []
+        for url in urls:
+            try:
+                expiries.append(float(parse_qs(urlsplit(url).query)["P1"][0]) - self._EXPIRY_MARGIN)
+            except (KeyError, ValueError):
+                expiries.append(now + self._DEFAULT_TTL)
+        return min(expiries, default=now)
+
+    def _get_entries(self) -> dict[str, _EntryModel]:
+        if self._entries is None:
+            try:
+                with self._FILE.open() as f:
+                    cache_model = _CacheModel.model_validate_json(f.read(), strict=True)
+            except (OSError, ValidationError):
+                self._entries = {}
+            else:
+                now = time.time()
+                self._entries = {guid: entry for guid, entry in cache_model.links.items() if entry.expires > now}
+        return self._entries
+
+    def _save(self) -> None:
+        now = time.time()
+        for guid in [guid for guid, entry in self._get_entries().items() if entry.expires <= now]:
+            del self._get_entries()[guid]
+        temp_file = self._FILE.with_name(self._FILE.name + ".tmp")
+        with temp_file.open("w") as f:
+            f.write(_CacheModel(format_version=1, links=self._get_entries()).model_dump_json(indent=2))
+        temp_file.replace(self._FILE)
+
+
+class _CacheModel(BaseModel):
+    format_version: Literal[1]
+    links: dict[str, _EntryModel]
+
+
+class _EntryModel(BaseModel):
+    urls: list[str]
+    expires: float
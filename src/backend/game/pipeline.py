@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from backend.cancellationtoken import CancellationTokenSource, Cancelled
+from backend.tracing import Tracer
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Sequence
+
+    from backend.cancellationtoken import CancellationToken
+    from backend.report import Report
+
+
+@dataclass(frozen=True, slots=True)
+class Step:
+    """A step of a pipeline, which starts once the steps named in `dependencies` have finished."""
+
+    name: str
+    run: Callable[[CancellationToken, Callable[[Report], object]], object]
+    dependencies: tuple[str, ...] = ()
+
+
+def run_pipeline(
+    steps: Sequence[Step],
+    cancellation_token: CancellationToken | None = None,
+    reporthook: Callable[[Report], object] | None = None,
+    max_workers: int = 4,
+) -> None:
+    """Run every step as soon as its dependencies have finished, with independent steps running at the same time.
+
+    The steps share a cancellation token, which is cancelled as soon as a step fails or `cancellation_token` is
+    cancelled. The steps that are running are then waited for, no further steps are started and the first failure is
+    raised, or `Cancelled`. The reports of the steps are merged as described in `_ReportMerger`.
+    """
+    _validate(steps)
+    source = CancellationTokenSource(cancellation_token)
+    merger = _ReportMerger(steps, reporthook)
+    parent_span = Tracer.current_span
+    finished_names: set[str] = set()
+    pending_steps = list(steps)
+    future_to_step: dict[Future[object], Step] = {}
+    error: Exception | None = None
+
+    def run(step: Step) -> object:
+        with Tracer.continue_span(parent_span), Tracer.span(step.name, "step"):
+            return step.run(source.token, lambda report: merger.propel(step, report))
+
+    try:
+        with ThreadPoolExecutor(max_workers, "LaunchStep") as executor:
+            while True:
+                if error is None and not source.token.cancelled:
+                    for step in [step for step in pending_steps if finished_names.issuperset(step.dependencies)]:
+                        pending_steps.remove(step)
+                        merger.start(step)
+                        future_to_step[executor.submit(run, step)] = step
+                if not future_to_step:
+                    break
+
+                done, _ = wait(future_to_step, return_when=FIRST_COMPLETED)
+                for future in done:
+                    step = future_to_step.pop(future)
+                    merger.finish(step)
+                    try:
+                        future.result()
+                    except Cancelled:
+                        source.cancel()
+                    except Exception as e:  # noqa: BLE001
+                        if error is None:
+                            error = e
+                        source.cancel()
+                    else:
+                        finished_names.add(step.name)
+    finally:
+        source.close()
+
+    if error is not None:
+        raise error
+    # A step that has been cancelled hasn't finished either, even if it was the last one.
+    if len(finished_names) < len(steps):
+        raise Cancelled
+
+
+def _validate(steps: Sequence[Step]) -> None:
+    name_to_step = {step.name: step for step in steps}
+    if len(name_to_step) != len(steps):
+        error_msg = "Step names must be unique."
+        raise ValueError(error_msg)
+    for step in steps:
+        if unknown_names := set(step.dependencies).difference(name_to_step):
+            error_msg = f'Step "{step.name}" depends on unknown steps: {", ".join(sorted(unknown_names))}.'
+            raise ValueError(error_msg)
+
+    resolved_names: set[str] = set()
+    unresolved_steps = list(steps)
+    while unresolved_steps:
+        resolvable_steps = [step for step in unresolved_steps if resolved_names.issuperset(step.dependencies)]
+        if not resolvable_steps:
+            error_msg = f"The dependencies of {', '.join(step.name for step in unresolved_steps)} form a cycle."
+            raise ValueError(error_msg)
+        for step in resolvable_steps:
+            unresolved_steps.remove(step)
+            resolved_names.add(step.name)
+
+
+class _ReportMerger:
+    """Forwards the reports of the running step that comes first in the pipeline.
+
+    The latest reports of the other running steps are held back, and the one of the step that takes over is forwarded
+    when the step before it finishes.
+    """
+
+    def __init__(self, steps: Sequence[Step], reporthook: Callable[[Report], object] | None) -> None:
+        self._order = {step.name: index for index, step in enumerate(steps)}
+        self._reporthook = reporthook
+        self._running_steps: list[Step] = []
+        self._step_to_report: dict[str, Report] = {}
+        self._lock = threading.Lock()
+
+    def start(self, step: Step) -> None:
+        with self._lock:
+            self._running_steps.append(step)
+            self._running_steps.sort(key=lambda running_step: self._order[running_step.name])
+
+    def finish(self, step: Step) -> None:
+        with self._lock:
+            was_leading = bool(self._running_steps) and self._running_steps[0] is step
+            self._running_steps.remove(step)
+            self._step_to_report.pop(step.name, None)
+            if was_leading and self._running_steps and self._reporthook:
+                report = self._step_to_report.get(self._running_steps[0].name)
+                if report:
+                    self._reporthook(report)
+
+    def propel(self, step: Step, report: Report) -> None:
+        with self._lock:
+            self._step_to_report[step.name] = report
+            if self._reporthook and self._running_steps and self._running_steps[0] is step:
+                self._reporthook(report)
@@ -0,0 +1,102 @@
+"""Preparing the instance that is most likely launched next, so that a launch is left with little more than starting it.
+
+The package of the instance is downloaded as a background job, the installed packages are queried and access to the
+game directory is granted while the launcher is otherwise idle. A launch cancels the pre-warming without waiting for
+it. The launch joins an installed-packages query that is still running and waits for a package that is being verified,
+while an access grant that is in progress is cancelled and the launch waits for it to stop. An interactive download
+takes over the background job as usual.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+from typing import TYPE_CHECKING
+
+from backend import packagemanager, utility
+from backend.cancellationtoken import CancellationTokenSource, Cancelled
+from backend.settings import Settings
+from backend.tracing import Tracer
+
+from . import step as _step
+from .downloadmanager import DownloadJob, DownloadManager
+
+if TYPE_CHECKING:
+    from backend.cancellationtoken import CancellationToken
+    from backend.core import Instance
+
+
+@utility.typed_namespace
+class Prewarmer:
+    """Pre-warms an instance on a background thread while `Settings.prewarm_enabled` is set."""
+
+    def __init__(self) -> None:
+        self._cancellation_token_source: CancellationTokenSource | None = None
+        self._job: DownloadJob | None = None
+        self._lock = threading.Lock()
+
+    def start(self, instance: Instance) -> None:
+        """Pre-warm the instance, replacing the pre-warming of any other one."""
+        if not Settings.prewarm_enabled:
+            return
+        self.cancel()
+        with self._lock:
+            self._cancellation_token_source = CancellationTokenSource()
+            threading.Thread(
+                target=self._run,
+                args=(instance, self._cancellation_token_source.token),
+                name="Prewarm",
+                daemon=True,
+            ).start()
+
+    def cancel(self, *, cancel_download: bool = False) -> None:
+        """Stop the pre-warming without waiting for it to wind down.
+
+        The download it has queued carries on in the background, unless `cancel_download` is set and nothing else has
+        raised its priority since.
+        """
+        with self._lock:
+            source, self._cancellation_token_source = self._cancellation_token_source, None
+            job, self._job = (self._job, None) if cancel_download else (None, self._job)
+        if source:
+            source.cancel()
+        if job:
+            self._cancel_job(job)
+
+    @staticmethod
+    def _cancel_job(job: DownloadJob) -> None:
+        if not job.done and job.priority == DownloadJob.Priority.BACKGROUND:
+            DownloadManager.cancel(job)
+
+    def _run(self, instance: Instance, cancellation_token: CancellationToken) -> None:
+        version = instance.version
+        architecture = instance.architecture_choice
+        logging.debug('Pre-warming instance "%s"...', instance.name)
+        try:
+            with Tracer.span("prewarm", "prewarm", instance=instance.name, version=version.name):
+                job = None
+                if not version.is_downloaded(architecture):
+                    # A job that was already there belongs to the user, unless an earlier pre-warming has queued it.
+                    existing_job = DownloadManager.get_job(version, architecture)
+                    job = DownloadManager.enqueue(version, architecture, DownloadJob.Priority.BACKGROUND)
+                    if existing_job is None:
+                        with self._lock:
+                            source = self._cancellation_token_source
+                            current = source is not None and source.token is cancellation_token
+                            if current:
+                                self._job = job
+                        # A cancellation that came in meanwhile has missed the job, so switching off is caught up on.
+                        if not current and not Settings.prewarm_enabled:
+                            self._cancel_job(job)
+
+                # The download runs on its own thread, so the rest is done while it is in progress.
+                packagemanager.InstalledPackages.get(cancellation_token)
+                _step.grant_access(instance, cancellation_token)
+                if job:
+                    job.wait(cancellation_token)
+        except Cancelled:
+            logging.debug('Pre-warming of instance "%s" has been cancelled.', instance.name)
+        except Exception:
+            logging.exception('Couldn\'t pre-warm instance "%s".', instance.name)
+        else:
+            logging.debug('Pre-warmed instance "%s".', instance.name)
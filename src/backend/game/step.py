@@ -2,12 +2,16 @@ from __future__ import annotations
 
 import logging
 import os
+import threading
 from pathlib import Path
 from typing import TYPE_CHECKING
 
 from backend import packagemanager, shell
+from backend.packagestore import PackageStore
 from backend.report import Report
 
+from . import accessgrant
+
 if TYPE_CHECKING:
     from collections.abc import Callable
 
@@ -15,8 +19,52 @@ if TYPE_CHECKING:
     from backend.core import Architecture, Instance, Version
 
 
-def grant_access(directory: Path, user_sid: str) -> None:
-    shell.run_command(f'icacls "{directory}" /grant:r *{user_sid}:(OI)(CI)F /t', log_stdout=False)
+# Grants to the same instance share its access record, so they are made one at a time.
+_directory_to_access_lock: dict[Path, threading.Lock] = {}
+_access_locks_lock = threading.Lock()
+_POLL_INTERVAL = 0.1
+
+
+def grant_access(
+    instance: Instance,
+    cancellation_token: CancellationToken | None = None,
+    reporthook: Callable[[Report], object] | None = None,
+    force: bool = False,
+) -> None:
+    """Grant the game access to the game directory of the instance, or to what has appeared in it since last time."""
+    user_sid = instance.version.user_sid
+    # icacls prints a line for every file of the tree, which is turned into progress instead of being kept in memory.
+    counter = shell.ProcessedFileCounter("Checking game files...")
+
+    def apply(grant: accessgrant.Grant) -> None:
+        shell.run_parsed_command(
+            f'icacls "{grant.path}" /grant:r *{user_sid}:(OI)(CI)F /t',
+            counter,
+            cancellation_token,
+            reporthook,
+        )
+
+    with _access_locks_lock:
+        lock = _directory_to_access_lock.setdefault(instance.directory, threading.Lock())
+    while not lock.acquire(timeout=_POLL_INTERVAL):
+        if cancellation_token:
+            cancellation_token.check()
+    try:
+        grants = accessgrant.grant_access(
+            instance.directory / "com.mojang",
+            user_sid,
+            get_access_record_file(instance),
+            apply,
+            force,
+            cancellation_token,
+        )
+    finally:
+        lock.release()
+    logging.debug("Applied %s access grants.", len(grants))
+
+
+def get_access_record_file(instance: Instance) -> Path:
+    return instance.directory / "access.json"
 
 
 def install(
@@ -25,15 +73,20 @@ def install(
     cancellation_token: CancellationToken | None = None,
     reporthook: Callable[[Report], object] | None = None,
 ) -> None:
+    package = PackageStore.get_package(version.name, architecture)
+    if not package:
+        error_msg = f"Minecraft {version.name} has not been downloaded."
+        raise FileNotFoundError(error_msg)
+
     if reporthook:
         reporthook(Report(Report.Type.PROGRESS, "Unlinking old version..."))
-    for package_dict in packagemanager.find_packages(version.pfn, cancellation_token):
-        packagemanager.remove_package(package_dict["PackageFullName"], cancellation_token)
+    for package_full_name in packagemanager.find_packages(version.pfn, cancellation_token):
+        packagemanager.remove_package(package_full_name, cancellation_token)
 
     logging.info("Installing Minecraft %s...", version.name)
     if reporthook:
         reporthook(Report(Report.Type.PROGRESS, "Installing Minecraft..."))
-    packagemanager.add_package(version.architecture_to_package[architecture], cancellation_token)
+    packagemanager.add_package(package, version.get_package_full_name(architecture), cancellation_token)
 
 
 def relink_game_files(instance: Instance, cancellation_token: CancellationToken | None = None) -> None:
@@ -11,11 +11,10 @@ from backend.core import Architecture, Instance
 from .instancegroup import InstanceGroup
 
 if TYPE_CHECKING:
-    from collections.abc import Iterable
     from pathlib import Path
     from typing import Self
 
-    from backend.core import Version
+    from backend.core import VersionCatalog
 
 
 @dataclass(frozen=True, slots=True)
@@ -24,7 +23,7 @@ class LoadResult:
     last_instance: Instance | None
 
 
-def load(directory: Path, versions: Iterable[Version]) -> LoadResult:
+def load(directory: Path, versions: VersionCatalog) -> LoadResult:
     try:
         with (directory / "groups.json").open() as f:
             groups_model = _GroupsModel.model_validate_json(f.read(), strict=True)
@@ -112,12 +111,15 @@ def _load_instance_groups(
     group_models: list[_GroupModel],
     last_instance_dirname: str | None,
     directory: Path,
-    versions: Iterable[Version],
+    versions: VersionCatalog,
 ) -> list[InstanceGroup]:
-    instances = [
-        instance for item in directory.iterdir() if item.is_dir() if (instance := _load_instance(item, versions))
-    ]
-    if not instances:
+    dirname_to_instance = {
+        item.name: instance
+        for item in directory.iterdir()
+        if item.is_dir()
+        if (instance := _load_instance(item, versions))
+    }
+    if not dirname_to_instance:
         return []
 
     groups: list[InstanceGroup] = []
@@ -125,27 +127,21 @@ def _load_instance_groups(
         instances_of_group = [
             instance
             for instance_dirname in group_model.instances
-            if (
-                instance := next(
-                    (instance for instance in instances if instance.directory.name == instance_dirname),
-                    None,
-                )
-            )
+            if (instance := dirname_to_instance.pop(instance_dirname, None))
         ]
         if not instances_of_group:
             continue
-        for instance in instances_of_group:
-            instances.remove(instance)
         groups.append(
             InstanceGroup(
                 group_model.name,
                 instances_of_group,
                 False
-                if last_instance_dirname in [instance.directory.name for instance in instances_of_group]
+                if any(instance.directory.name == last_instance_dirname for instance in instances_of_group)
                 or group_model.name == ""
                 else group_model.hidden,
             ),
         )
+    instances = list(dirname_to_instance.values())
     if not instances:
         return groups
 
@@ -167,7 +163,7 @@ class _VersionModel(BaseModel):
     architecture_choice: Architecture
 
 
-def _load_instance(directory: Path, versions: Iterable[Version]) -> Instance | None:
+def _load_instance(directory: Path, versions: VersionCatalog) -> Instance | None:
     if any(whitespace_character in directory.name for whitespace_character in string.whitespace) or (
         not (directory / "com.mojang").is_dir()
     ):
@@ -175,13 +171,10 @@ def _load_instance(directory: Path, versions: Iterable[Version]) -> Instance | N
     try:
         with (directory / "config.json").open() as f:
             instance_model = _InstanceModel.model_validate_json(f.read(), strict=True)
-        version = next(
-            v
-            for v in versions
-            if (v.name == instance_model.version.name)
-            and (instance_model.version.architecture_choice in v.available_architectures)
-        )
-    except (OSError, ValidationError, StopIteration):
+    except (OSError, ValidationError):
+        return None
+    version = versions.get(instance_model.version.name)
+    if version is None or instance_model.version.architecture_choice not in version.available_architectures:
         return None
     return Instance(instance_model.name, version, instance_model.version.architecture_choice, directory)
 
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
 from . import soap
-from .request import download_file
+from .request import DownloadError, LinkExpiredError, download_file, get_partial_download_urls
 
-__all__ = "download_file", "soap"
+__all__ = "DownloadError", "LinkExpiredError", "download_file", "get_partial_download_urls", "soap"
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import time
+from typing import TYPE_CHECKING
+
+from backend.report import Report
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+
+class ProgressAggregator:
+    """Turns a stream of byte counts into reports emitted at a bounded rate.
+
+    A report is emitted once at least `min_interval` seconds have passed since the previous one and either the transfer
+    has advanced by `min_fraction` of its total size or `max_interval` seconds have passed. The clock is only consulted
+    every `_CHECK_STEP` bytes, so other updates return after a single integer comparison.
+
+    The reported speed is an exponentially smoothed throughput in the same unit per second, the ETA is in seconds.
+    """
+
+    _MEBIBYTE = pow(1024, 2)
+    _CHECK_STEP = 256 * 1024
+    _SMOOTHING = 0.3
+
+    def __init__(  # noqa: PLR0913
+        self,
+        reporthook: Callable[[Report], object],
+        total_size: int,
+        processed: int = 0,
+        text: str = "Downloading...",
+        min_interval: float = 0.2,
+        max_interval: float = 1.0,
+        min_fraction: float = 0.01,
+    ) -> None:
+        self._reporthook = reporthook
+        self._total_size = total_size
+        self._text = text
+        self._min_interval = min_interval
+        self._max_interval = max_interval
+        self._min_step = int(total_size * min_fraction)
+
+        self._next_check = processed + self._CHECK_STEP
+        self._last_emit_time = time.monotonic()
+        self._last_emit_processed = processed
+        self._speed: float | None = None
+
+    def update(self, processed: int) -> None:
+        if processed < self._next_check:
+            return
+        self._next_check = processed + self._CHECK_STEP
+
+        now = time.monotonic()
+        elapsed = now - self._last_emit_time
+        if elapsed < self._min_interval or (
+            processed - self._last_emit_processed < self._min_step and elapsed < self._max_interval
+        ):
+            return
+        self._emit(processed, now)
+
+    def finish(self, processed: int) -> None:
+        self._emit(processed, time.monotonic())
+
+    def _emit(self, processed: int, now: float) -> None:
+        elapsed = now - self._last_emit_time
+        if elapsed > 0:
+            speed = (processed - self._last_emit_processed) / elapsed
+            self._speed = (
+                speed if self._speed is None else self._SMOOTHING * speed + (1 - self._SMOOTHING) * self._speed
+            )
+        self._last_emit_time = now
+        self._last_emit_processed = processed
+
+        if self._total_size <= 0:
+            self._reporthook(Report(Report.Type.PROGRESS, self._text))
+            return
+        rounded_total_size = round(self._total_size / self._MEBIBYTE, 1)
+        self._reporthook(
+            Report(
+                Report.Type.PROGRESS,
+                self._text,
+                Report.Progress(
+                    min(round(processed / self._MEBIBYTE, 1), rounded_total_size),
+                    rounded_total_size,
+                    "MB",
+                    round(self._speed / self._MEBIBYTE, 2) if self._speed is not None else None,
+                    round((self._total_size - processed) / self._speed) if self._speed else None,
+                ),
+            ),
+        )
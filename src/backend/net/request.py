@@ -1,63 +1,526 @@
 from __future__ import annotations
 
-import shutil
-import tempfile
-from pathlib import Path
-from typing import TYPE_CHECKING
-from urllib import request
-from uuid import uuid4
+import errno
+import hashlib
+import logging
+import os
+import re
+import threading
+from collections import deque
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Literal
 
-from backend.report import Report
+import requests
+import urllib3
+from pydantic import BaseModel, ValidationError
+
+from backend import digest
+from backend.cancellationtoken import CancellationTokenSource, Cancelled
+from backend.tracing import Tracer
+
+from .progress import ProgressAggregator
+from .throttle import GOVERNOR
+from .transport import TRANSPORT
 
 if TYPE_CHECKING:
-    from collections.abc import Callable
+    from collections.abc import Callable, Iterable, Iterator, Sequence
+    from pathlib import Path
+    from typing import BinaryIO
 
     from backend.cancellationtoken import CancellationToken
+    from backend.report import Report
+
+    from .throttle import Transfer
 
 
 def download_file(
-    url: str,
+    urls: str | Sequence[str],
     destination: Path,
     cancellation_token: CancellationToken | None = None,
     reporthook: Callable[[Report], object] | None = None,
+    connections: int = 4,
+) -> str:
+    """Download a file, fetching byte ranges over several connections when the server supports it.
+
+    Every URL in `urls` must point to the same file. They are treated as mirrors: segments are spread across them,
+    and a segment that fails on one mirror is retried on the next.
+
+    The file is staged next to the destination. If the server supports ranges, the staged file and a record of the
+    fetched ranges are kept when the download is interrupted, and the next call for the same destination continues
+    where it stopped. `LinkExpiredError` is raised when the URLs no longer grant access to the file.
+
+    The file is hashed while it is being written. Its digest, as defined by `digest`, is returned.
+    """
+    mirrors = (urls,) if isinstance(urls, str) else tuple(urls)
+    if not mirrors:
+        error_msg = "No URLs to download from."
+        raise ValueError(error_msg)
+
+    partial_file = destination.with_name(destination.name + ".part")
+    remote_file = _get_remote_file(mirrors)
+    with (
+        Tracer.span("download_file", "network", segmented=remote_file is not None) as span,
+        GOVERNOR.transfer() as transfer,
+    ):
+        if remote_file is None:
+            logging.debug("Downloading over a single connection...")
+            # A mirror has served the file without ranges, so an earlier partial download can't be continued.
+            _PartialDownload.discard(partial_file)
+            try:
+                file_digest = _download_stream(mirrors, partial_file, transfer, cancellation_token, reporthook)
+            except:
+                partial_file.unlink(missing_ok=True)
+                raise
+            span.bytes = partial_file.stat().st_size
+        else:
+            partial_download = _PartialDownload.load(partial_file, remote_file)
+            if partial_download:
+                logging.debug("Resuming the download from byte %s...", partial_download.completed_size)
+            else:
+                partial_download = _PartialDownload.create(partial_file, remote_file)
+            partial_download.urls = mirrors
+            logging.debug("Downloading %s bytes over %s connections...", remote_file.size, connections)
+            initial_size = partial_download.completed_size
+            try:
+                file_digest = _download_segmented(
+                    mirrors,
+                    partial_download,
+                    connections,
+                    transfer,
+                    cancellation_token,
+                    reporthook,
+                )
+            finally:
+                span.bytes = partial_download.completed_size - initial_size
+
+    partial_file.replace(destination)
+    _PartialDownload.discard(partial_file)
+    statistics = TRANSPORT.statistics
+    logging.debug(
+        "%s requests have been sent over %s connections so far.",
+        statistics.requests,
+        statistics.connections,
+    )
+    return file_digest
+
+
+def get_partial_download_urls(destination: Path) -> tuple[str, ...]:
+    """Return the URLs an interrupted download of `destination` was using, if there is one."""
+    model = _PartialDownload.load_model(destination.with_name(destination.name + ".part"))
+    return tuple(model.urls) if model else ()
+
+
+class DownloadError(Exception):
+    pass
+
+
+class LinkExpiredError(DownloadError):
+    pass
+
+
+# Blocks are read with `read1`, which returns whatever has arrived up to this size instead of waiting for all of it.
+_BLOCK_SIZE = 1024 * 1024
+_ATTEMPTS_PER_MIRROR = 2
+_EXPIRED_LINK_STATUSES = frozenset({403, 404, 410})
+_CONTENT_RANGE_PATTERN = re.compile(r"bytes (\d+)-(\d+)/(\d+)")
+
+
+@dataclass(frozen=True, slots=True)
+class _RemoteFile:
+    size: int
+    etag: str | None
+    last_modified: str | None
+
+
+def _get_remote_file(mirrors: Sequence[str]) -> _RemoteFile | None:
+    """Describe the file if a mirror honours `Range` requests, return `None` if one serves it without ranges.
+
+    Raises `LinkExpiredError` if every mirror denies access to the file and `DownloadError` if none serves it, so that
+    a temporary outage doesn't pass for a server without range support.
+    """
+    expired_mirror_count = 0
+    error: Exception | None = None
+    for url in mirrors:
+        try:
+            with TRANSPORT.get(url, headers=_get_range_headers(0, 0)) as response:
+                if response.status_code >= 400:  # noqa: PLR2004
+                    logging.debug('Mirror "%s" responded with %s.', url, response.status_code)
+                    if response.status_code in _EXPIRED_LINK_STATUSES:
+                        expired_mirror_count += 1
+                    continue
+                if response.status_code != 206:
+                    return None
+                match = _CONTENT_RANGE_PATTERN.fullmatch(response.headers.get("Content-Range", ""))
+                if not match or int(match.group(3)) <= 0:
+                    return None
+                # Reading the body returns the connection to the pool.
+                _ = response.content
+                return _RemoteFile(
+                    int(match.group(3)),
+                    response.headers.get("ETag"),
+                    response.headers.get("Last-Modified"),
+                )
+        except requests.RequestException as e:
+            logging.debug('Mirror "%s" is unavailable.', url)
+            error = e
+    if expired_mirror_count == len(mirrors):
+        error_msg = "The download link has expired."
+        raise LinkExpiredError(error_msg)
+    error_msg = "Couldn't reach any mirror."
+    raise DownloadError(error_msg) from error
+
+
+class _PartialDownloadModel(BaseModel):
+    format_version: Literal[1]
+    urls: list[str]
+    size: int
+    etag: str | None
+    last_modified: str | None
+    completed: list[tuple[int, int]]
+    chunk_digests: list[str | None]
+
+
+class _PartialDownload:
+    """A staged file together with the byte ranges of it that have been fetched and the digests of its full chunks.
+
+    The state is saved to a sidecar file every time it changes.
+    """
+
+    def __init__(
+        self,
+        file: Path,
+        remote_file: _RemoteFile,
+        urls: Sequence[str],
+        completed: Sequence[tuple[int, int]],
+        chunk_digests: Sequence[str | None],
+    ) -> None:
+        self._file = file
+        self._remote_file = remote_file
+        self.urls = tuple(urls)
+        self._completed = list(completed)
+        self._chunk_digests = list(chunk_digests)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def create(cls, file: Path, remote_file: _RemoteFile) -> _PartialDownload:
+        with file.open("wb") as f:
+            _preallocate(f, remote_file.size)
+        return cls(file, remote_file, (), (), [None] * _get_chunk_count(remote_file.size))
+
+    @classmethod
+    def load(cls, file: Path, remote_file: _RemoteFile) -> _PartialDownload | None:
+        model = cls.load_model(file)
+        if not model:
+            return None
+        if (
+            model.size != remote_file.size
+            or (model.etag, model.last_modified) != (remote_file.etag, remote_file.last_modified)
+            or file.stat().st_size != remote_file.size
+            or len(model.chunk_digests) != _get_chunk_count(remote_file.size)
+        ):
+            logging.debug('The partial download at "%s" is outdated.', file)
+            cls.discard(file)
+            return None
+        return cls(file, remote_file, model.urls, model.completed, model.chunk_digests)
+
+    @staticmethod
+    def load_model(file: Path) -> _PartialDownloadModel | None:
+        if not file.is_file():
+            return None
+        try:
+            with _get_sidecar(file).open() as f:
+                return _PartialDownloadModel.model_validate_json(f.read(), strict=True)
+        except (OSError, ValidationError):
+            return None
+
+    @staticmethod
+    def discard(file: Path) -> None:
+        _get_sidecar(file).unlink(missing_ok=True)
+        file.unlink(missing_ok=True)
+
+    @property
+    def file(self) -> Path:
+        return self._file
+
+    @property
+    def size(self) -> int:
+        return self._remote_file.size
+
+    @property
+    def completed_size(self) -> int:
+        return sum(end + 1 - start for start, end in self._completed)
+
+    def get_missing_ranges(self) -> list[tuple[int, int]]:
+        missing: list[tuple[int, int]] = []
+        position = 0
+        for start, end in self._completed:
+            if start > position:
+                missing.append((position, start - 1))
+            position = end + 1
+        if position < self.size:
+            missing.append((position, self.size - 1))
+        return missing
+
+    def get_digest(self) -> str:
+        if None in self._chunk_digests:
+            error_msg = "Not every chunk of the file has been hashed."
+            raise DownloadError(error_msg)
+        return digest.combine(bytes.fromhex(chunk_digest) for chunk_digest in self._chunk_digests if chunk_digest)
+
+    def add_completed(self, start: int, end: int, chunk_digest: bytes | None = None) -> None:
+        with self._lock:
+            if chunk_digest:
+                self._chunk_digests[start // digest.CHUNK_SIZE] = chunk_digest.hex()
+            merged: list[tuple[int, int]] = []
+            for range_ in sorted([*self._completed, (start, end)]):
+                if merged and range_[0] <= merged[-1][1] + 1:
+                    merged[-1] = (merged[-1][0], max(merged[-1][1], range_[1]))
+                else:
+                    merged.append(range_)
+            self._completed = merged
+            self._save()
+
+    def _save(self) -> None:
+        sidecar = _get_sidecar(self.file)
+        temp_sidecar = sidecar.with_name(sidecar.name + ".tmp")
+        with temp_sidecar.open("w") as f:
+            f.write(
+                _PartialDownloadModel(
+                    format_version=1,
+                    urls=list(self.urls),
+                    size=self.size,
+                    etag=self._remote_file.etag,
+                    last_modified=self._remote_file.last_modified,
+                    completed=self._completed,
+                    chunk_digests=self._chunk_digests,
+                ).model_dump_json(),
+            )
+        temp_sidecar.replace(sidecar)
+
+
+def _get_sidecar(file: Path) -> Path:
+    return file.with_name(file.name + ".json")
+
+
+def _download_stream(
+    mirrors: Sequence[str],
+    file: Path,
+    transfer: Transfer,
+    cancellation_token: CancellationToken | None = None,
+    reporthook: Callable[[Report], object] | None = None,
+) -> str:
+    error: Exception | None = None
+    for url in mirrors:
+        # Every mirror starts over with an empty file, since the stream can't be resumed without ranges.
+        try:
+            with TRANSPORT.get(url, headers={"Accept-Encoding": "identity"}) as response, file.open("wb") as f:
+                response.raise_for_status()
+                total_size = int(response.headers.get("Content-Length", -1))
+                if total_size > 0:
+                    _preallocate(f, total_size)
+                processed = 0
+                hasher = digest.StreamHasher()
+                aggregator = ProgressAggregator(reporthook, total_size) if reporthook else None
+                while block := response.raw.read1(_BLOCK_SIZE):
+                    if cancellation_token:
+                        cancellation_token.check()
+                    f.write(block)
+                    hasher.update(block)
+                    processed += len(block)
+                    transfer.consume(len(block), cancellation_token)
+                    if aggregator:
+                        aggregator.update(processed)
+                if 0 <= total_size != processed:
+                    error_msg = f"Expected {total_size} bytes, received {processed}."
+                    raise DownloadError(error_msg)
+                if aggregator:
+                    aggregator.finish(processed)
+        except (requests.RequestException, urllib3.exceptions.HTTPError, DownloadError) as e:
+            logging.debug('Downloading from mirror "%s" failed: %s', url, e)
+            error = e
+            continue
+        return hasher.hexdigest()
+    error_msg = "Couldn't download the file from any mirror."
+    raise DownloadError(error_msg) from error
+
+
+def _download_segmented(
+    mirrors: Sequence[str],
+    partial_download: _PartialDownload,
+    connections: int,
+    transfer: Transfer,
+    cancellation_token: CancellationToken | None = None,
+    reporthook: Callable[[Report], object] | None = None,
+) -> str:
+    segments = deque(_split_at_chunk_boundaries(partial_download.get_missing_ranges()))
+    if not segments:
+        return partial_download.get_digest()
+    progress = _SharedCounter(partial_download.completed_size)
+    aggregator = ProgressAggregator(reporthook, partial_download.size, progress.value) if reporthook else None
+    # Cancelling the download stops the workers right away, while the loop below only checks in between updates.
+    stop_source = CancellationTokenSource(cancellation_token)
+
+    def work(worker_index: int) -> None:
+        with partial_download.file.open("r+b") as f:
+            while True:
+                try:
+                    start, end = segments.popleft()
+                except IndexError:
+                    return
+                try:
+                    _fetch_segment(
+                        mirrors,
+                        worker_index,
+                        f,
+                        (start, end),
+                        _SegmentContext(partial_download, progress, transfer, stop_source.token),
+                    )
+                except Cancelled:
+                    return
+
+    worker_count = min(connections, len(segments))
+    with ThreadPoolExecutor(worker_count, "Download") as executor:
+        futures = [executor.submit(work, i) for i in range(worker_count)]
+        try:
+            while True:
+                done, not_done = wait(futures, 0.1, FIRST_EXCEPTION)
+                for future in done:
+                    future.result()
+                if cancellation_token:
+                    cancellation_token.check()
+                if not not_done:
+                    break
+                if aggregator:
+                    aggregator.update(progress.value)
+            if aggregator:
+                aggregator.finish(progress.value)
+        finally:
+            stop_source.cancel()
+            stop_source.close()
+
+    if partial_download.completed_size != partial_download.size:
+        error_msg = f"Expected {partial_download.size} bytes, received {partial_download.completed_size}."
+        raise DownloadError(error_msg)
+    return partial_download.get_digest()
+
+
+@dataclass(frozen=True, slots=True)
+class _SegmentContext:
+    partial_download: _PartialDownload
+    progress: _SharedCounter
+    transfer: Transfer
+    stop: CancellationToken
+
+
+def _fetch_segment(
+    mirrors: Sequence[str],
+    worker_index: int,
+    f: BinaryIO,
+    segment: tuple[int, int],
+    context: _SegmentContext,
 ) -> None:
-    temp_file = Path(tempfile.mkdtemp()) / str(uuid4())
-    urlretrieve_reporthook = _get_urlretrieve_reporthook(reporthook, cancellation_token)
+    start, end = segment
+    position = start
+    error: Exception | None = None
+    expired_attempt_count = 0
+
+    # A segment never crosses a chunk boundary. If it starts inside a chunk, the beginning of the chunk was written by
+    # an earlier, interrupted download and has to be hashed before the rest of the chunk arrives.
+    chunk_start = start - start % digest.CHUNK_SIZE
+    chunk_hasher = hashlib.sha256()
+    if chunk_start < start:
+        f.seek(chunk_start)
+        chunk_hasher.update(f.read(start - chunk_start))
+
     try:
-        request.urlretrieve(url, temp_file, urlretrieve_reporthook)  # noqa: S310
-    except:  # noqa: TRY203
-        raise
-    else:
-        temp_file.replace(destination)
+        for attempt in range(len(mirrors) * _ATTEMPTS_PER_MIRROR):
+            url = mirrors[(worker_index + attempt) % len(mirrors)]
+            try:
+                with TRANSPORT.get(url, headers=_get_range_headers(position, end)) as response:
+                    response.raise_for_status()
+                    match = _CONTENT_RANGE_PATTERN.fullmatch(response.headers.get("Content-Range", ""))
+                    if response.status_code != 206 or not match or int(match.group(1)) != position:
+                        error_msg = f'Mirror "{url}" ignored the requested range.'
+                        raise DownloadError(error_msg)
+                    f.seek(position)
+                    while position <= end:
+                        context.stop.check()
+                        block = response.raw.read1(min(_BLOCK_SIZE, end + 1 - position))
+                        if not block:
+                            break
+                        f.write(block)
+                        chunk_hasher.update(block)
+                        position += len(block)
+                        context.progress.add(len(block))
+                        context.transfer.consume(len(block), context.stop)
+                if position > end:
+                    return
+            except requests.HTTPError as e:
+                logging.debug('Segment %s-%s failed on "%s": %s', position, end, url, e)
+                error = e
+                if e.response is not None and e.response.status_code in _EXPIRED_LINK_STATUSES:
+                    expired_attempt_count += 1
+            except (requests.RequestException, urllib3.exceptions.HTTPError, OSError, DownloadError) as e:
+                logging.debug('Segment %s-%s failed on "%s": %s', position, end, url, e)
+                error = e
     finally:
-        shutil.rmtree(temp_file.parent, True)
+        if position > start:
+            f.flush()
+            context.partial_download.add_completed(
+                start,
+                position - 1,
+                chunk_hasher.digest() if position > end else None,
+            )
 
+    if expired_attempt_count == len(mirrors) * _ATTEMPTS_PER_MIRROR:
+        error_msg = "The download link has expired."
+        raise LinkExpiredError(error_msg) from error
+    error_msg = f"Couldn't download bytes {position}-{end} from any mirror."
+    raise DownloadError(error_msg) from error
 
-def _get_urlretrieve_reporthook(
-    reporthook: Callable[[Report], object] | None = None,
-    cancellation_token: CancellationToken | None = None,
-) -> Callable[[int, int, int], None]:
-    def urlretrieve_reporthook(block_num: int, block_size: int, total_size: int) -> None:
-        if cancellation_token:
-            cancellation_token.check()
 
-        if not reporthook:
+def _preallocate(f: BinaryIO, size: int) -> None:
+    """Reserve the space of the whole file up front, so that it is less fragmented and a full disk fails early."""
+    if hasattr(os, "posix_fallocate"):
+        try:
+            os.posix_fallocate(f.fileno(), 0, size)
+        except OSError as e:
+            if e.errno not in {errno.EINVAL, errno.EOPNOTSUPP}:
+                raise
+        else:
             return
+    # Extending a file on NTFS allocates its clusters, unlike on file systems that support sparse files by default.
+    f.truncate(size)
 
-        if total_size <= 0:
-            reporthook(Report(Report.Type.PROGRESS, "Downloading..."))
-            return
-        rounded_total_size = round(float(total_size) / pow(1024, 2), 1)
-        reporthook(
-            Report(
-                Report.Type.PROGRESS,
-                "Downloading...",
-                Report.Progress(
-                    min(round(float(block_num * block_size) / pow(1024, 2), 1), rounded_total_size),
-                    rounded_total_size,
-                    "MB",
-                ),
-            ),
-        )
-
-    return urlretrieve_reporthook
+
+def _get_chunk_count(size: int) -> int:
+    return -(-size // digest.CHUNK_SIZE)
+
+
+def _split_at_chunk_boundaries(ranges: Iterable[tuple[int, int]]) -> Iterator[tuple[int, int]]:
+    for start, end in ranges:
+        segment_start = start
+        while segment_start <= end:
+            segment_end = min(segment_start - segment_start % digest.CHUNK_SIZE + digest.CHUNK_SIZE - 1, end)
+            yield segment_start, segment_end
+            segment_start = segment_end + 1
+
+
+def _get_range_headers(start: int, end: int) -> dict[str, str]:
+    # Ranges refer to the stored bytes, so the response must not be compressed in transit.
+    return {"Range": f"bytes={start}-{end}", "Accept-Encoding": "identity"}
+
+
+class _SharedCounter:
+    def __init__(self, value: int = 0) -> None:
+        self._value = value
+        self._lock = threading.Lock()
+
+    @property
+    def value(self) -> int:
+        return self._value
+
+    def add(self, amount: int) -> None:
+        with self._lock:
+            self._value += amount
@@ -1,29 +1,57 @@
 from __future__ import annotations
 
+import contextlib
 from datetime import UTC, datetime, timedelta
+from typing import TYPE_CHECKING
 from xml.etree import ElementTree as ET
 
-import requests
-
-
-def post_envelope(url: str, envelope: Envelope) -> ET.Element:
-    res = requests.post(
-        url,
-        ET.tostring(envelope),
-        headers={"content-type": "application/soap+xml; charset=utf-8"},
-        timeout=10,
-        verify=False,  # noqa: S501
-    )
-
-    if res.status_code != 200:
-        error_msg = (
-            error_msg.strip()
-            if (error_msg := ET.fromstring(res.content).findtext("./{*}Body/{*}Fault/{*}Reason/{*}Text"))  # noqa: S314
-            else "An unknown error has occurred."
-        )
-        raise SOAPError(error_msg)
-
-    return ET.fromstring(res.content)  # noqa: S314
+from . import throttle
+from .transport import TRANSPORT
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator, Sequence
+
+    import requests
+
+    from backend.cancellationtoken import CancellationToken
+
+
+def iter_response_elements(
+    url: str,
+    envelope: Envelope,
+    path: Sequence[str],
+    cancellation_token: CancellationToken | None = None,
+) -> Iterator[ET.Element]:
+    """Post an envelope and yield the elements at `path` below the response body while the response is being read.
+
+    `path` consists of local names. Elements outside the yielded ones are discarded as soon as they end, so no tree of
+    the response is built, and the rest of the response is not read once the parent of the yielded elements has ended.
+
+    Cancelling `cancellation_token` aborts the response, so a read that is waiting for data ends with `Cancelled`.
+    """
+    if cancellation_token:
+        cancellation_token.check()
+    with (
+        _post(url, envelope) as res,
+        contextlib.closing(throttle.iter_content(res, cancellation_token, chunk_size=16 * 1024)) as chunks,
+    ):
+        unregister_callback = cancellation_token.register(lambda: TRANSPORT.abort(res)) if cancellation_token else None
+        try:
+            if res.status_code != 200:
+                reason = next(_iter_elements(chunks, ("Envelope", "Body", "Fault", "Reason", "Text")), None)
+                error_msg = (
+                    reason.text.strip() if reason is not None and reason.text else "An unknown error has occurred."
+                )
+                raise SOAPError(error_msg)
+            yield from _iter_elements(chunks, ("Envelope", "Body", *path))
+        except Exception:
+            # Reading an aborted response fails with whatever error the connection raises.
+            if cancellation_token:
+                cancellation_token.check()
+            raise
+        finally:
+            if unregister_callback:
+                unregister_callback()
 
 
 class Envelope(ET.Element):
@@ -49,6 +77,45 @@ _WUCLIENT = "http://www.microsoft.com/SoftwareDistribution/Server/ClientWebServi
 _WSU = "http://docs.oasis-open.org/wss/2004/01/oasis-200401-wss-wssecurity-utility-1.0.xsd"
 
 
+def _post(url: str, envelope: Envelope) -> requests.Response:
+    return TRANSPORT.post(
+        url,
+        ET.tostring(envelope),
+        headers={"content-type": "application/soap+xml; charset=utf-8"},
+        # The certificate of the update service is issued by a Microsoft CA that is not in the CA bundle of requests.
+        verify=False,  # noqa: S501
+    )
+
+
+def _iter_elements(chunks: Iterable[bytes], path: tuple[str, ...]) -> Iterator[ET.Element]:
+    parser = ET.XMLPullParser(("start", "end"))
+    elements: list[ET.Element] = []
+    names: list[str] = []
+    for chunk in chunks:
+        parser.feed(chunk)
+        for event, element in parser.read_events():
+            if event == "start":
+                elements.append(element)
+                names.append(element.tag.rpartition("}")[2])
+                continue
+
+            current_path = tuple(names)
+            if len(current_path) > len(path) and current_path[: len(path)] == path:
+                # A descendant of a matching element has to stay in the tree until the match is yielded.
+                elements.pop()
+                names.pop()
+                continue
+            if current_path == path:
+                yield element
+            elif current_path == path[:-1]:
+                return
+
+            elements.pop()
+            names.pop()
+            if elements:
+                elements[-1].remove(element)
+
+
 class _Header(ET.Element):
     def __init__(self, url: str, method_name: str) -> None:
         super().__init__("s:Header")
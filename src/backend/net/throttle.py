@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import contextlib
+import threading
+import time
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Generator, Iterator
+
+    import requests
+
+    from backend.cancellationtoken import CancellationToken
+
+
+class BandwidthGovernor:
+    """Caps the combined throughput of every transfer that goes through it.
+
+    The rate is split evenly between the transfers that are active at the moment, each of which has its own token
+    bucket. A transfer that consumes more than it has tokens for goes into debt and sleeps until the debt is repaid, so
+    the average rate stays exact even when blocks are much larger than what the rate allows per second.
+    """
+
+    _BURST_DURATION = 0.05
+    _WAIT_SLICE = 0.1
+
+    def __init__(self, rate: int | None = None) -> None:
+        self._rate = rate
+        self._transfers: list[Transfer] = []
+        self._lock = threading.Lock()
+
+    @property
+    def rate(self) -> int | None:
+        """The cap in bytes per second, `None` if there is none."""
+        return self._rate
+
+    @rate.setter
+    def rate(self, value: int | None) -> None:
+        if value is not None and value <= 0:
+            error_msg = "The rate must be positive."
+            raise ValueError(error_msg)
+        with self._lock:
+            self._rate = value
+
+    @property
+    def share(self) -> float | None:
+        """The rate every active transfer is allowed."""
+        rate = self._rate
+        if rate is None:
+            return None
+        return rate / max(len(self._transfers), 1)
+
+    @contextlib.contextmanager
+    def transfer(self) -> Generator[Transfer]:
+        transfer = Transfer(self)
+        with self._lock:
+            self._transfers.append(transfer)
+        try:
+            yield transfer
+        finally:
+            with self._lock:
+                self._transfers.remove(transfer)
+
+
+class Transfer:
+    def __init__(self, governor: BandwidthGovernor) -> None:
+        self._governor = governor
+        self._tokens = 0.0
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consume(self, amount: int, cancellation_token: CancellationToken | None = None) -> None:
+        """Account for `amount` transferred bytes, blocking for as long as the transfer is over its share."""
+        if self._governor.rate is None:
+            return
+        with self._lock:
+            deficit = self._withdraw(amount)
+        while deficit > 0:
+            share = self._governor.share
+            if share is None:
+                return
+            # Waiting in slices keeps the wait responsive to changes of the rate.
+            delay = min(deficit / share, BandwidthGovernor._WAIT_SLICE)  # noqa: SLF001
+            if cancellation_token:
+                cancellation_token.wait(delay)
+                cancellation_token.check()
+            else:
+                time.sleep(delay)
+            with self._lock:
+                deficit = self._withdraw(0)
+
+    def _withdraw(self, amount: int) -> float:
+        now = time.monotonic()
+        share = self._governor.share
+        if share is None:
+            self._tokens = 0.0
+        else:
+            self._tokens = min(
+                self._tokens + (now - self._last_refill) * share,
+                share * BandwidthGovernor._BURST_DURATION,  # noqa: SLF001
+            )
+            self._tokens -= amount
+        self._last_refill = now
+        return -self._tokens
+
+
+GOVERNOR = BandwidthGovernor()
+
+
+def read_content(
+    response: requests.Response,
+    cancellation_token: CancellationToken | None = None,
+    chunk_size: int = 64 * 1024,
+) -> bytes:
+    """Read the body of a streamed `requests` response through the governor."""
+    return b"".join(iter_content(response, cancellation_token, chunk_size))
+
+
+def iter_content(
+    response: requests.Response,
+    cancellation_token: CancellationToken | None = None,
+    chunk_size: int = 64 * 1024,
+) -> Iterator[bytes]:
+    """Iterate over the body of a streamed `requests` response through the governor."""
+    with GOVERNOR.transfer() as transfer:
+        for chunk in response.iter_content(chunk_size):
+            transfer.consume(len(chunk), cancellation_token)
+            yield chunk
@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+import contextlib
+import socket
+import threading
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3 import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.util import Retry
+
+from backend.tracing import Tracer
+
+if TYPE_CHECKING:
+    from collections.abc import Mapping
+
+
+class Transport:
+    """Issues every HTTP request of the launcher through keep-alive sessions, one per host.
+
+    Connections are pooled per session, so consecutive requests to the same host skip the DNS lookup and the TCP and TLS
+    handshakes. Failures to connect and transient server errors of idempotent requests are retried with a backoff.
+    """
+
+    TIMEOUT = (10, 30)
+    POOL_SIZE = 8
+    _RETRY = Retry(
+        total=3,
+        connect=3,
+        read=1,
+        status=2,
+        backoff_factor=0.5,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=frozenset({"GET", "HEAD"}),
+        raise_on_status=False,
+    )
+
+    def __init__(self) -> None:
+        self._host_to_session: dict[str, requests.Session] = {}
+        self._request_count = 0
+        self._lock = threading.Lock()
+
+    @property
+    def statistics(self) -> ConnectionStatistics:
+        """How many connections have been opened and how many requests have been sent over them."""
+        return ConnectionStatistics(_CONNECTION_COUNTER.value, self._request_count)
+
+    def request(  # noqa: PLR0913
+        self,
+        method: str,
+        url: str,
+        *,
+        data: bytes | None = None,
+        headers: Mapping[str, str] | None = None,
+        verify: bool = True,
+        stream: bool = True,
+    ) -> requests.Response:
+        session = self._get_session(url)
+        with self._lock:
+            self._request_count += 1
+        # Responses are streamed, so the span ends when the headers have arrived.
+        with Tracer.span("request", "network", method=method, host=urlsplit(url).netloc) as span:
+            response = session.request(
+                method,
+                url,
+                data=data,
+                headers=headers,
+                timeout=self.TIMEOUT,
+                verify=verify,
+                stream=stream,
+            )
+            span.args["status"] = response.status_code
+            return response
+
+    def get(
+        self,
+        url: str,
+        *,
+        headers: Mapping[str, str] | None = None,
+        stream: bool = True,
+    ) -> requests.Response:
+        return self.request("GET", url, headers=headers, stream=stream)
+
+    def post(
+        self,
+        url: str,
+        data: bytes,
+        *,
+        headers: Mapping[str, str] | None = None,
+        verify: bool = True,
+    ) -> requests.Response:
+        return self.request("POST", url, data=data, headers=headers, verify=verify)
+
+    @staticmethod
+    def abort(response: requests.Response) -> None:
+        """Shut down the connection of a streamed response, ending a read that is waiting for it on another thread.
+
+        Closing the response alone doesn't wake up such a read. A response whose connection is not kept alive no
+        longer has its socket on the connection, so a read of it only ends at the timeout.
+        """
+        sock = getattr(response.raw.connection, "sock", None)
+        if sock:
+            with contextlib.suppress(OSError):
+                sock.shutdown(socket.SHUT_RDWR)
+        response.close()
+
+    def close(self) -> None:
+        with self._lock:
+            sessions = tuple(self._host_to_session.values())
+            self._host_to_session.clear()
+        for session in sessions:
+            session.close()
+
+    def _get_session(self, url: str) -> requests.Session:
+        parts = urlsplit(url)
+        host = f"{parts.scheme}://{parts.netloc}"
+        with self._lock:
+            session = self._host_to_session.get(host)
+            if session is None:
+                session = requests.Session()
+                adapter = _HTTPAdapter(pool_connections=1, pool_maxsize=self.POOL_SIZE, max_retries=self._RETRY)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._host_to_session[host] = session
+            return session
+
+
+@dataclass(frozen=True, slots=True)
+class ConnectionStatistics:
+    connections: int
+    requests: int
+
+    @property
+    def reused(self) -> int:
+        """The number of requests that were sent over a connection opened for an earlier one."""
+        return max(self.requests - self.connections, 0)
+
+
+class _Counter:
+    def __init__(self) -> None:
+        self._value = 0
+        self._lock = threading.Lock()
+
+    @property
+    def value(self) -> int:
+        return self._value
+
+    def increment(self) -> None:
+        with self._lock:
+            self._value += 1
+
+
+_CONNECTION_COUNTER = _Counter()
+
+
+class _CountingHTTPConnection(HTTPConnection):
+    def connect(self) -> None:
+        super().connect()
+        _CONNECTION_COUNTER.increment()
+
+
+class _CountingHTTPSConnection(HTTPSConnection):
+    def connect(self) -> None:
+        super().connect()
+        _CONNECTION_COUNTER.increment()
+
+
+class _CountingHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _CountingHTTPConnection
+
+
+class _CountingHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _CountingHTTPSConnection
+
+
+class _HTTPAdapter(HTTPAdapter):
+    """An adapter whose pools count the connections they open, including reconnections of dropped ones."""
+
+    def init_poolmanager(self, *args: Any, **kwargs: Any) -> None:  # noqa: ANN401
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _CountingHTTPConnectionPool,
+            "https": _CountingHTTPSConnectionPool,
+        }
+
+
+TRANSPORT = Transport()
@@ -1,55 +1,218 @@
 from __future__ import annotations
 
-import json
-from typing import TYPE_CHECKING, TypedDict, cast
+import sys
+import threading
+from concurrent.futures import Future
+from types import MappingProxyType
+from typing import TYPE_CHECKING
 
-from . import shell
+from . import shellhost, utility
+
+if sys.platform == "win32":
+    import winreg
 
 if TYPE_CHECKING:
+    from collections.abc import Mapping
     from pathlib import Path
 
     from .cancellationtoken import CancellationToken
 
 
-class PackageDict(TypedDict):
-    PackageFullName: str
-
-
-def find_packages(package_family_name: str, cancellation_token: CancellationToken | None = None) -> list[PackageDict]:
-    return (
-        (
-            [cast(PackageDict, deserialized_output)]
-            if isinstance((deserialized_output := json.loads(output)), dict)
-            else deserialized_output
-        )
-        if (
-            output := shell.run_command(
-                (
-                    "powershell",
-                    f'Get-AppxPackage | Where-Object {{$_.PackageFamilyName -eq "{package_family_name}"}} | ConvertTo-Json',  # noqa: E501
-                ),
-                cancellation_token,
-                False,
-            )
-        )
-        else []
+# Queries and launches return quickly, so a host that takes longer has most likely hung.
+_TIMEOUT = 60
+
+# Every function runs its commands in the shell host it is given, which is the shared PowerShell host by default.
+
+
+@utility.typed_namespace
+class InstalledPackages:
+    """The full names of the installed packages, keyed by package family name.
+
+    They are retrieved with a single query and kept until the package registration of the user changes, which is
+    detected through the subkey count and the modification time of its registry key. Packages added and removed through
+    this module are applied to the cache directly.
+    """
+
+    _REGISTRY_KEY = (
+        r"Software\Classes\Local Settings\Software\Microsoft\Windows\CurrentVersion\AppModel\Repository\Packages"
     )
 
+    def __init__(self) -> None:
+        self._pfn_to_package_full_names: Mapping[str, tuple[str, ...]] | None = None
+        self._fingerprint: tuple[int, int] | None = None
+        # Counts the updates and invalidations, so that a query that overlaps with one doesn't overwrite it.
+        self._generation = 0
+        # The query in progress, shared by the callers that miss the cache meanwhile, and the state it was started in.
+        self._query_future: Future[Mapping[str, tuple[str, ...]]] | None = None
+        self._query_state: tuple[int, tuple[int, int] | None] | None = None
+        self._lock = threading.Lock()
+
+    def get(
+        self,
+        cancellation_token: CancellationToken | None = None,
+        host: shellhost.ShellHost = shellhost.POWERSHELL_HOST,
+    ) -> Mapping[str, tuple[str, ...]]:
+        with self._lock:
+            fingerprint = self._get_fingerprint()
+            if self._pfn_to_package_full_names is not None and fingerprint == self._fingerprint:
+                return self._pfn_to_package_full_names
+            # The query can take a while, so the lock isn't held during it and readers of a current cache don't wait.
+            state = self._generation, fingerprint
+            future = self._query_future
+            if future is None or self._query_state != state:
+                future = self._query_future = Future()
+                self._query_state = state
+                threading.Thread(
+                    target=self._run_query,
+                    args=(future, state, host),
+                    name="InstalledPackages",
+                    daemon=True,
+                ).start()
+        return _wait(future, cancellation_token)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._pfn_to_package_full_names = None
+            self._generation += 1
+
+    def update(self, package_full_name: str, *, installed: bool) -> None:
+        """Record that the package has been installed or removed."""
+        with self._lock:
+            self._generation += 1
+            if self._pfn_to_package_full_names is None:
+                return
+            pfn = _get_pfn(package_full_name)
+            package_full_names = tuple(
+                name for name in self._pfn_to_package_full_names.get(pfn, ()) if name != package_full_name
+            )
+            if installed:
+                package_full_names += (package_full_name,)
+            pfn_to_package_full_names = dict(self._pfn_to_package_full_names)
+            pfn_to_package_full_names[pfn] = package_full_names
+            self._pfn_to_package_full_names = MappingProxyType(pfn_to_package_full_names)
+            # The change has been applied, so the registry key it has modified doesn't need another query.
+            self._fingerprint = self._get_fingerprint()
+
+    def _get_fingerprint(self) -> tuple[int, int] | None:
+        """Return the subkey count and the modification time of the registry key, or `None` if it can't be read.
+
+        Without a fingerprint, only the changes made through this module are noticed.
+        """
+        if sys.platform != "win32":
+            return None
+        try:
+            with winreg.OpenKey(winreg.HKEY_CURRENT_USER, self._REGISTRY_KEY) as key:
+                subkey_count, _, modification_time = winreg.QueryInfoKey(key)
+        except OSError:
+            return None
+        return subkey_count, modification_time
+
+    def _run_query(
+        self,
+        future: Future[Mapping[str, tuple[str, ...]]],
+        state: tuple[int, tuple[int, int] | None],
+        host: shellhost.ShellHost,
+    ) -> None:
+        # The query isn't cancelled along with a caller, since the others still wait for it.
+        try:
+            pfn_to_package_full_names = self._query(host)
+        except Exception as e:  # noqa: BLE001
+            with self._lock:
+                if self._query_future is future:
+                    self._query_future = self._query_state = None
+            future.set_exception(e)
+            return
+
+        with self._lock:
+            if self._query_future is future:
+                self._query_future = self._query_state = None
+            if state == (self._generation, self._get_fingerprint()):
+                self._pfn_to_package_full_names = pfn_to_package_full_names
+                self._fingerprint = state[1]
+        future.set_result(pfn_to_package_full_names)
+
+    @staticmethod
+    def _query(host: shellhost.ShellHost) -> Mapping[str, tuple[str, ...]]:
+        output = host.run("Get-AppxPackage | ForEach-Object { $_.PackageFullName }", None, _TIMEOUT, False)
+        pfn_to_package_full_names: dict[str, tuple[str, ...]] = {}
+        for package_full_name in output.split():
+            pfn = _get_pfn(package_full_name)
+            pfn_to_package_full_names[pfn] = (*pfn_to_package_full_names.get(pfn, ()), package_full_name)
+        return MappingProxyType(pfn_to_package_full_names)
 
-def remove_package(package_full_name: str, cancellation_token: CancellationToken | None = None) -> None:
-    shell.run_command(("powershell", f'Remove-AppxPackage -Package "{package_full_name}"'), cancellation_token)
 
+def _wait(
+    future: Future[Mapping[str, tuple[str, ...]]],
+    cancellation_token: CancellationToken | None,
+) -> Mapping[str, tuple[str, ...]]:
+    """Return the result of `future`, or raise `Cancelled` if the token is cancelled before it is done."""
+    if cancellation_token:
+        woken = threading.Event()
+        future.add_done_callback(lambda _: woken.set())
+        unregister_callback = cancellation_token.register(woken.set)
+        try:
+            woken.wait()
+        finally:
+            unregister_callback()
+        cancellation_token.check()
+    return future.result()
 
-def add_package(package: Path, cancellation_token: CancellationToken | None = None) -> None:
-    shell.run_command(("powershell", f'Add-AppxPackage "{package}"'), cancellation_token)
+
+def find_packages(
+    package_family_name: str,
+    cancellation_token: CancellationToken | None = None,
+    host: shellhost.ShellHost = shellhost.POWERSHELL_HOST,
+) -> tuple[str, ...]:
+    """Return the full names of the installed packages of the family."""
+    return InstalledPackages.get(cancellation_token, host).get(package_family_name, ())
+
+
+def remove_package(
+    package_full_name: str,
+    cancellation_token: CancellationToken | None = None,
+    host: shellhost.ShellHost = shellhost.POWERSHELL_HOST,
+) -> None:
+    _run_package_operation(f'Remove-AppxPackage -Package "{package_full_name}"', cancellation_token, host)
+    InstalledPackages.update(package_full_name, installed=False)
+
+
+def add_package(
+    package: Path,
+    package_full_name: str,
+    cancellation_token: CancellationToken | None = None,
+    host: shellhost.ShellHost = shellhost.POWERSHELL_HOST,
+) -> None:
+    _run_package_operation(f'Add-AppxPackage "{package}"', cancellation_token, host)
+    InstalledPackages.update(package_full_name, installed=True)
 
 
 def launch_package(
     package_family_name: str,
     application_id: str,
     cancellation_token: CancellationToken | None = None,
+    host: shellhost.ShellHost = shellhost.POWERSHELL_HOST,
 ) -> None:
-    shell.run_command(
-        ("powershell", f"explorer.exe shell:appsFolder\\{package_family_name}!{application_id}"),
+    host.run(
+        f"explorer.exe shell:appsFolder\\{package_family_name}!{application_id}",
         cancellation_token,
+        _TIMEOUT,
     )
+
+
+def _run_package_operation(
+    command: str,
+    cancellation_token: CancellationToken | None,
+    host: shellhost.ShellHost,
+) -> None:
+    try:
+        host.run(command, cancellation_token)
+    except BaseException:
+        # An operation that has failed or been cancelled may still have changed the registration.
+        InstalledPackages.invalidate()
+        raise
+
+
+def _get_pfn(package_full_name: str) -> str:
+    # A full name consists of the name, version, architecture, resource ID and publisher ID, separated by underscores.
+    name, *_, publisher_id = package_full_name.split("_")
+    return f"{name}_{publisher_id}"
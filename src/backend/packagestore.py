@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import logging
+import threading
+from typing import TYPE_CHECKING, Literal
+
+from pydantic import BaseModel, ValidationError
+
+from . import digest, utility
+from .core.architecture import Architecture
+from .path import VERSIONS_DIRECTORY
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+
+@utility.typed_namespace
+class PackageStore:
+    """Downloaded packages stored under their digest.
+
+    A manifest maps every version name and architecture to the digest of its package, along with the size and
+    modification time the package had when it was last verified. A package is hashed again only when those change.
+
+    Packages downloaded before the store existed, at `<version name>_<architecture>.Appx` in the versions directory,
+    are hashed into the store the first time they are looked up, or deleted if the store already has the package.
+    """
+
+    DIRECTORY = VERSIONS_DIRECTORY / "packages"
+
+    _MANIFEST = DIRECTORY / "manifest.json"
+    _LEGACY_DIRECTORY = VERSIONS_DIRECTORY
+
+    def __init__(self) -> None:
+        self._entries: dict[tuple[str, Architecture], _EntryModel] | None = None
+        self._lock = threading.RLock()
+
+    def get_staging_file(self, version_name: str, architecture: Architecture) -> Path:
+        """Return where a package is downloaded to before it is added to the store."""
+        return self.DIRECTORY / f"{version_name}_{architecture}.Appx"
+
+    def get_package(self, version_name: str, architecture: Architecture) -> Path | None:
+        with self._lock:
+            entry = self._get_entries().get((version_name, architecture))
+            if not entry:
+                return self._adopt_legacy_package(version_name, architecture)
+
+            package = self._get_package_file(entry.digest)
+            try:
+                stat = package.stat()
+            except OSError:
+                self._forget_digest(entry.digest)
+                return None
+            if (stat.st_size, stat.st_mtime_ns) == (entry.size, entry.mtime_ns):
+                return package
+
+            logging.debug('Verifying "%s"...', package)
+            if stat.st_size != entry.size or digest.hash_file(package) != entry.digest:
+                logging.warning('The package at "%s" is corrupted.', package)
+                self._forget_digest(entry.digest)
+                package.unlink(missing_ok=True)
+                return None
+            entries = self._get_entries()
+            for key, other_entry in entries.items():
+                if other_entry.digest == entry.digest:
+                    entries[key] = other_entry.model_copy(update={"mtime_ns": stat.st_mtime_ns})
+            self._save()
+            return package
+
+    def add_package(self, version_name: str, architecture: Architecture, file: Path, file_digest: str) -> Path:
+        """Move a freshly downloaded file with the given digest into the store."""
+        with self._lock:
+            package = self._get_package_file(file_digest)
+            file.replace(package)
+            stat = package.stat()
+            self._get_entries()[(version_name, architecture)] = _EntryModel(
+                version_name=version_name,
+                architecture=architecture,
+                digest=file_digest,
+                size=stat.st_size,
+                mtime_ns=stat.st_mtime_ns,
+            )
+            self._save()
+            return package
+
+    def _adopt_legacy_package(self, version_name: str, architecture: Architecture) -> Path | None:
+        legacy_package = self._get_legacy_package_file(version_name, architecture)
+        if not legacy_package.is_file():
+            return None
+        logging.info('Adding "%s" to the package store...', legacy_package)
+        try:
+            file_digest = digest.hash_file(legacy_package)
+        except OSError:
+            logging.exception('Couldn\'t hash "%s".', legacy_package)
+            return None
+        return self.add_package(version_name, architecture, legacy_package, file_digest)
+
+    def _get_legacy_package_file(self, version_name: str, architecture: Architecture) -> Path:
+        return self._LEGACY_DIRECTORY / f"{version_name}_{architecture}.Appx"
+
+    def _delete_stored_legacy_packages(self) -> None:
+        """Delete the legacy packages of the versions the store already has, which would otherwise never be used."""
+        for version_name, architecture in self._get_entries():
+            legacy_package = self._get_legacy_package_file(version_name, architecture)
+            try:
+                legacy_package.unlink(missing_ok=True)
+            except OSError:
+                logging.exception('Couldn\'t delete "%s".', legacy_package)
+
+    def _get_package_file(self, file_digest: str) -> Path:
+        return self.DIRECTORY / f"{file_digest}.Appx"
+
+    def _get_entries(self) -> dict[tuple[str, Architecture], _EntryModel]:
+        if self._entries is None:
+            try:
+                with self._MANIFEST.open() as f:
+                    manifest_model = _ManifestModel.model_validate_json(f.read(), strict=True)
+            except (OSError, ValidationError):
+                self._entries = {}
+            else:
+                self._entries = {(entry.version_name, entry.architecture): entry for entry in manifest_model.packages}
+            self._delete_stored_legacy_packages()
+        return self._entries
+
+    def _forget_digest(self, file_digest: str) -> None:
+        entries = self._get_entries()
+        for key in [key for key, entry in entries.items() if entry.digest == file_digest]:
+            del entries[key]
+        self._save()
+
+    def _save(self) -> None:
+        self.DIRECTORY.mkdir(parents=True, exist_ok=True)
+        temp_manifest = self._MANIFEST.with_name(self._MANIFEST.name + ".tmp")
+        with temp_manifest.open("w") as f:
+            f.write(
+                _ManifestModel(format_version=1, packages=list(self._get_entries().values())).model_dump_json(indent=2),
+            )
+        temp_manifest.replace(self._MANIFEST)
+
+
+class _ManifestModel(BaseModel):
+    format_version: Literal[1]
+    packages: list[_EntryModel]
+
+
+class _EntryModel(BaseModel):
+    version_name: str
+    architecture: Architecture
+    digest: str
+    size: int
+    mtime_ns: int
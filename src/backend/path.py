@@ -12,3 +12,4 @@ _root = (
 if not _root:
     sys.exit(-1)
 ROOT_DIRECTORY = _root
+VERSIONS_DIRECTORY = ROOT_DIRECTORY / "versions"
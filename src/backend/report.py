@@ -19,9 +19,17 @@ class Report:
         processed: float
         totalsize: float
         unit: str
+        speed: float | None = None
+        eta: float | None = None
 
         def to_dict(self) -> dict[str, object]:
-            return {"processed": self.processed, "totalsize": self.totalsize, "unit": self.unit}
+            return {
+                "processed": self.processed,
+                "totalsize": self.totalsize,
+                "unit": self.unit,
+                "speed": self.speed,
+                "eta": self.eta,
+            }
 
     def to_dict(self) -> dict[str, object]:
         return {
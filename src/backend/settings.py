@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+from typing import Literal
+
+from pydantic import BaseModel, ValidationError
+
+from . import utility
+from .path import ROOT_DIRECTORY
+
+
+class _SettingsModel(BaseModel):
+    format_version: Literal[1]
+    bandwidth_limit: int | None = None
+    version_refresh_interval: int | None = 60 * 60
+    tracing_enabled: bool = False
+    prewarm_enabled: bool = False
+
+
+@utility.typed_namespace
+class Settings:
+    _FILE = ROOT_DIRECTORY / "settings.json"
+
+    def __init__(self) -> None:
+        try:
+            with self._FILE.open() as f:
+                self._model = _SettingsModel.model_validate_json(f.read(), strict=True)
+        except (OSError, ValidationError):
+            self._model = _SettingsModel(format_version=1)
+
+    @property
+    def bandwidth_limit(self) -> int | None:
+        """The cap on the combined network throughput in bytes per second, `None` if there is none."""
+        return self._model.bandwidth_limit
+
+    @bandwidth_limit.setter
+    def bandwidth_limit(self, value: int | None) -> None:
+        if value == self.bandwidth_limit:
+            return
+        self._model.bandwidth_limit = value
+        self._save()
+
+    @property
+    def version_refresh_interval(self) -> int | None:
+        """The interval of the scheduled refreshes of the version list in seconds, `None` if they are disabled."""
+        return self._model.version_refresh_interval
+
+    @version_refresh_interval.setter
+    def version_refresh_interval(self, value: int | None) -> None:
+        if value == self.version_refresh_interval:
+            return
+        self._model.version_refresh_interval = value
+        self._save()
+
+    @property
+    def tracing_enabled(self) -> bool:
+        """Whether the steps of launches are timed and written to the trace file."""
+        return self._model.tracing_enabled
+
+    @tracing_enabled.setter
+    def tracing_enabled(self, value: bool) -> None:
+        if value == self.tracing_enabled:
+            return
+        self._model.tracing_enabled = value
+        self._save()
+
+    @property
+    def prewarm_enabled(self) -> bool:
+        """Whether the last instance is prepared for its next launch in the background."""
+        return self._model.prewarm_enabled
+
+    @prewarm_enabled.setter
+    def prewarm_enabled(self, value: bool) -> None:
+        if value == self.prewarm_enabled:
+            return
+        self._model.prewarm_enabled = value
+        self._save()
+
+    def _save(self) -> None:
+        temp_file = self._FILE.with_name(self._FILE.name + ".tmp")
+        with temp_file.open("w") as f:
+            f.write(self._model.model_dump_json(indent=2))
+        temp_file.replace(self._FILE)
+
@@ -2,16 +2,21 @@ from __future__ import annotations
 
 import contextlib
 import logging
+import os
 import shutil
 import subprocess
+import threading
+import time
+from collections import deque
 from typing import TYPE_CHECKING
 
 import pathvalidate
 
-from .cancellationtoken import Cancelled
+from .report import Report
+from .tracing import Tracer
 
 if TYPE_CHECKING:
-    from collections.abc import Sequence
+    from collections.abc import Callable, Generator, Sequence
     from pathlib import Path
 
     from cancellationtoken import CancellationToken
@@ -54,22 +59,25 @@ def run_command(
     log_stdout: bool = True,
 ) -> str:
     logging.debug('Executing command: "%s"...', command)
-    with subprocess.Popen(  # noqa: S603
-        command,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        creationflags=subprocess.CREATE_NO_WINDOW,
-        text=True,
-    ) as process:
+    with (
+        Tracer.span("command", "subprocess", program=_get_program_name(command)) as span,
+        subprocess.Popen(  # noqa: S603
+            command,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            creationflags=subprocess.CREATE_NO_WINDOW,
+            text=True,
+        ) as process,
+    ):
+        # The process is terminated by the thread that cancels the token, so the wait below doesn't have to poll.
+        unregister_callback = cancellation_token.register(process.terminate) if cancellation_token else None
+        try:
+            stdout, stderr = process.communicate()
+        finally:
+            if unregister_callback:
+                unregister_callback()
         if cancellation_token:
-            try:
-                while process.poll() is None:
-                    cancellation_token.check()
-            except Cancelled:
-                process.terminate()
-                raise
-
-        stdout, stderr = process.communicate()
+            cancellation_token.check()
 
         if process.returncode:
             error_msg = stderr if stderr else f"The process finished with the code {process.returncode}."
@@ -79,4 +87,118 @@ def run_command(
         if log_stdout and stdout:
             logging.debug('Command result: "%s".', stdout)
 
+        span.bytes = len(stdout)
         return stdout
+
+
+_LOGGED_LINE_LIMIT = 20
+_ERROR_LINE_LIMIT = 20
+_MAX_LINE_LENGTH = 16 * 1024
+
+
+def iter_command_output(
+    command: str | bytes | Sequence[str | bytes],
+    cancellation_token: CancellationToken | None = None,
+    log_stdout: bool = True,
+) -> Generator[str]:
+    """Run `command` and yield the lines of its output as they arrive, without line breaks.
+
+    Only the first lines of the output are logged, and only the last lines of the error output are kept for the error
+    message. Lines longer than `_MAX_LINE_LENGTH` characters are split.
+    """
+    logging.debug('Executing command: "%s"...', command)
+    with (
+        Tracer.span("command", "subprocess", program=_get_program_name(command)) as span,
+        subprocess.Popen(  # noqa: S603
+            command,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            creationflags=subprocess.CREATE_NO_WINDOW,
+            text=True,
+            errors="replace",
+        ) as process,
+    ):
+        stdout, stderr = _get_pipe(process.stdout), _get_pipe(process.stderr)
+        error_lines: deque[str] = deque(maxlen=_ERROR_LINE_LIMIT)
+        stderr_thread = threading.Thread(target=error_lines.extend, args=(stderr,), name="CommandErrors", daemon=True)
+        stderr_thread.start()
+        unregister_callback = cancellation_token.register(process.terminate) if cancellation_token else None
+        line_count = 0
+        try:
+            while raw_line := stdout.readline(_MAX_LINE_LENGTH):
+                line = raw_line.rstrip("\r\n")
+                line_count += 1
+                span.bytes = (span.bytes or 0) + len(raw_line)
+                if log_stdout and line_count <= _LOGGED_LINE_LIMIT:
+                    logging.debug('Command output: "%s".', line)
+                yield line
+            process.wait()
+            stderr_thread.join()
+        finally:
+            if unregister_callback:
+                unregister_callback()
+            # The caller may stop iterating early, in which case the process is no longer needed.
+            if process.poll() is None:
+                process.terminate()
+        if cancellation_token:
+            cancellation_token.check()
+
+        if log_stdout and line_count > _LOGGED_LINE_LIMIT:
+            logging.debug("%s more lines of output were not logged.", line_count - _LOGGED_LINE_LIMIT)
+
+        if process.returncode:
+            error_msg = "".join(error_lines).strip() or f"The process finished with the code {process.returncode}."
+            logging.error(error_msg)
+            raise subprocess.SubprocessError(error_msg)
+
+
+def run_parsed_command(
+    command: str | bytes | Sequence[str | bytes],
+    line_parser: Callable[[str], Report | None],
+    cancellation_token: CancellationToken | None = None,
+    reporthook: Callable[[Report], object] | None = None,
+) -> None:
+    """Run `command`, passing every line of its output to `line_parser` and the reports it returns to `reporthook`."""
+    for line in iter_command_output(command, cancellation_token):
+        if (report := line_parser(line)) and reporthook:
+            reporthook(report)
+
+
+class ProcessedFileCounter:
+    """A line parser for commands that print a line for every file they process, such as `icacls /t`.
+
+    Reports are returned at most every `min_interval` seconds.
+    """
+
+    def __init__(self, text: str, min_interval: float = 0.2) -> None:
+        self._text = text
+        self._min_interval = min_interval
+        self._count = 0
+        self._last_report_time = time.monotonic()
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    def __call__(self, line: str) -> Report | None:
+        if not line.strip():
+            return None
+        self._count += 1
+        now = time.monotonic()
+        if now - self._last_report_time < self._min_interval:
+            return None
+        self._last_report_time = now
+        return Report(Report.Type.PROGRESS, f"{self._text} ({self._count} files processed)")
+
+
+def _get_program_name(command: str | bytes | Sequence[str | bytes]) -> str:
+    if isinstance(command, (str, bytes)):
+        command = command.split(maxsplit=1)[:1]
+    return os.fsdecode(command[0]) if command else ""
+
+
+def _get_pipe[T](pipe: T | None) -> T:
+    if pipe is None:
+        error_msg = "The output of the process is not piped."
+        raise ValueError(error_msg)
+    return pipe
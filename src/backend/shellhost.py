@@ -0,0 +1,281 @@
+from __future__ import annotations
+
+import base64
+import contextlib
+import json
+import logging
+import queue
+import subprocess
+import sys
+import threading
+import time
+from typing import IO, TYPE_CHECKING
+
+from .cancellationtoken import Cancelled
+from .tracing import Tracer
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+    from .cancellationtoken import CancellationToken
+
+
+class ShellHost:
+    """Runs commands in a long-lived shell process instead of starting a new one for each.
+
+    Requests are written to the standard input of the process as JSON lines of the form `{"id": 1, "command": "..."}`.
+    For each, the process writes a line starting with `RESPONSE_MARKER` and followed by JSON of the form
+    `{"id": 1, "output": "...", "error": null}` to its standard output. Other output is logged and otherwise ignored.
+    Any program that follows this protocol can serve as the process, such as a stand-in script on other platforms.
+
+    The process is started on the first request and handles one request at a time. If it crashes, it is started again
+    for the next request. A running command can't be interrupted, so a cancelled request returns right away while its
+    command runs to completion, and the next request waits for it. A request that times out kills the process, since
+    it has most likely hung; the next request of any caller then starts a new one.
+    """
+
+    RESPONSE_MARKER = "#nl-shell-host#"
+    _POLL_INTERVAL = 0.1
+
+    def __init__(self, command: Sequence[str]) -> None:
+        self._command = tuple(command)
+        self._process: subprocess.Popen[str] | None = None
+        self._responses: queue.Queue[dict[str, object] | None] = queue.Queue()
+        self._request_id = 0
+        self._lock = threading.Lock()
+
+    def run(
+        self,
+        command: str,
+        cancellation_token: CancellationToken | None = None,
+        timeout: float | None = None,
+        log_output: bool = True,
+    ) -> str:
+        """Run `command` and return its output.
+
+        Raises `subprocess.SubprocessError` if the command fails or the process exits while running it, and
+        `subprocess.TimeoutExpired` if it takes longer than `timeout` seconds.
+        """
+        if not command.strip():
+            error_msg = "The command is empty."
+            raise ValueError(error_msg)
+
+        with Tracer.span("shell_command", "subprocess", cmdlet=command.split(maxsplit=1)[0]) as span:
+            deadline = None if timeout is None else time.monotonic() + timeout
+            while not self._lock.acquire(timeout=self._POLL_INTERVAL):
+                self._check(command, cancellation_token, deadline, timeout)
+            release_lock = True
+            try:
+                # The lock may not have been contended, in which case the token hasn't been checked yet.
+                self._check(command, cancellation_token, deadline, timeout)
+                logging.debug('Executing shell command: "%s"...', command)
+                request_id = self._send(command)
+                try:
+                    response = self._receive(request_id, command, cancellation_token, deadline, timeout)
+                except Cancelled:
+                    # The lock is passed on to a thread that waits for the command to finish.
+                    release_lock = False
+                    threading.Thread(
+                        target=self._finish_cancelled_request,
+                        args=(request_id, command, deadline, timeout),
+                        name="ShellHostCancelled",
+                        daemon=True,
+                    ).start()
+                    raise
+            finally:
+                if release_lock:
+                    self._lock.release()
+
+            if response["error"] is not None:
+                error_msg = str(response["error"])
+                logging.error(error_msg)
+                raise subprocess.SubprocessError(error_msg)
+
+            output = str(response["output"] or "")
+            if log_output and output:
+                logging.debug('Shell command result: "%s".', output)
+            span.bytes = len(output)
+            return output
+
+    def close(self) -> None:
+        with self._lock:
+            self._stop()
+
+    def _send(self, command: str) -> int:
+        self._request_id += 1
+        request = json.dumps({"id": self._request_id, "command": command}) + "\n"
+        # A process that has crashed since the last request is only noticed when writing to it, in which case the
+        # request is sent to a new one.
+        for attempt in range(2):
+            process = self._get_process()
+            try:
+                stdin = _get_stream(process.stdin)
+                stdin.write(request)
+                stdin.flush()
+            except OSError:
+                if attempt:
+                    raise
+                logging.warning("The shell host has exited, restarting it.")
+                self._stop()
+            else:
+                break
+        return self._request_id
+
+    def _receive(
+        self,
+        request_id: int,
+        command: str,
+        cancellation_token: CancellationToken | None,
+        deadline: float | None,
+        timeout: float | None,
+    ) -> dict[str, object]:
+        responses = self._responses
+        # Cancelling the token puts an empty response into the queue, which wakes up the wait below.
+        unregister_callback = cancellation_token.register(lambda: responses.put({})) if cancellation_token else None
+        try:
+            while True:
+                try:
+                    self._check(command, cancellation_token, deadline, timeout)
+                    response = responses.get(timeout=None if deadline is None else max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    continue
+                except subprocess.TimeoutExpired:
+                    self._stop(kill=True)
+                    raise
+                if response is None:
+                    self._stop()
+                    error_msg = "The shell host exited while running the command."
+                    logging.error(error_msg)
+                    raise subprocess.SubprocessError(error_msg)
+                if response.get("id") == request_id:
+                    return response
+        finally:
+            if unregister_callback:
+                unregister_callback()
+
+    def _finish_cancelled_request(
+        self,
+        request_id: int,
+        command: str,
+        deadline: float | None,
+        timeout: float | None,
+    ) -> None:
+        try:
+            self._receive(request_id, command, None, deadline, timeout)
+        except (subprocess.SubprocessError, OSError):
+            logging.debug('The cancelled shell command "%s" has failed.', command)
+        finally:
+            self._lock.release()
+
+    @staticmethod
+    def _check(
+        command: str,
+        cancellation_token: CancellationToken | None,
+        deadline: float | None,
+        timeout: float | None,
+    ) -> None:
+        if cancellation_token:
+            cancellation_token.check()
+        if deadline is not None and timeout is not None and time.monotonic() >= deadline:
+            raise subprocess.TimeoutExpired(command, timeout)
+
+    def _get_process(self) -> subprocess.Popen[str]:
+        if self._process is None or self._process.poll() is not None:
+            self._stop()
+            logging.debug("Starting the shell host...")
+            self._process = subprocess.Popen(  # noqa: S603
+                self._command,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                creationflags=subprocess.CREATE_NO_WINDOW if sys.platform == "win32" else 0,
+                text=True,
+                encoding="utf-8",
+                bufsize=1,
+            )
+            self._responses = queue.Queue()
+            threading.Thread(
+                target=self._read_responses,
+                args=(_get_stream(self._process.stdout), self._responses),
+                name="ShellHostOutput",
+                daemon=True,
+            ).start()
+            threading.Thread(
+                target=self._log_errors,
+                args=(_get_stream(self._process.stderr),),
+                name="ShellHostErrors",
+                daemon=True,
+            ).start()
+        return self._process
+
+    def _stop(self, *, kill: bool = False) -> None:
+        process, self._process = self._process, None
+        if process is None:
+            return
+        with contextlib.suppress(OSError):
+            _get_stream(process.stdin).close()
+        if not kill:
+            try:
+                process.wait(1)
+            except subprocess.TimeoutExpired:
+                pass
+            else:
+                return
+        process.kill()
+        process.wait()
+
+    def _read_responses(self, stdout: IO[str], responses: queue.Queue[dict[str, object] | None]) -> None:
+        for line in stdout:
+            if not line.startswith(self.RESPONSE_MARKER):
+                logging.debug('Shell host output: "%s".', line.rstrip())
+                continue
+            try:
+                response = json.loads(line.removeprefix(self.RESPONSE_MARKER))
+            except json.JSONDecodeError:
+                logging.warning('The shell host sent an invalid response: "%s".', line.rstrip())
+                continue
+            responses.put(response)
+        responses.put(None)
+
+    @staticmethod
+    def _log_errors(stderr: IO[str]) -> None:
+        for line in stderr:
+            logging.debug('Shell host error output: "%s".', line.rstrip())
+
+
+def _get_stream(stream: IO[str] | None) -> IO[str]:
+    if stream is None:
+        error_msg = "The stream of the shell host is not piped."
+        raise ValueError(error_msg)
+    return stream
+
+
+_POWERSHELL_SCRIPT = f"""
+$ErrorActionPreference = 'Stop'
+$ProgressPreference = 'SilentlyContinue'
+$utf8 = New-Object System.Text.UTF8Encoding $false
+[Console]::InputEncoding = $utf8
+[Console]::OutputEncoding = $utf8
+while ($null -ne ($line = [Console]::In.ReadLine())) {{
+    $request = ConvertFrom-Json $line
+    try {{
+        $output = @(Invoke-Expression $request.command) -join "`n"
+        $response = @{{ id = $request.id; output = $output; error = $null }}
+    }} catch {{
+        $response = @{{ id = $request.id; output = $null; error = $_.ToString() }}
+    }}
+    [Console]::Out.WriteLine('{ShellHost.RESPONSE_MARKER}' + (ConvertTo-Json $response -Compress))
+    [Console]::Out.Flush()
+}}
+"""
+
+POWERSHELL_HOST = ShellHost(
+    (
+        "powershell",
+        "-NoLogo",
+        "-NoProfile",
+        "-NonInteractive",
+        "-EncodedCommand",
+        base64.b64encode(_POWERSHELL_SCRIPT.encode("utf-16-le")).decode(),
+    ),
+)
@@ -0,0 +1,174 @@
+"""Timing of the steps of a launch and of the subprocesses and network requests they make.
+
+Spans are written to a rolling trace file in the Chrome trace event format, which can be opened in `chrome://tracing`
+or Perfetto. Every span becomes a complete event with its arguments, the bytes it has transferred and its outcome.
+Spans that are started while another one is open on the same thread become its children, and the most recent trees
+of launch spans are kept in memory.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import IO, TYPE_CHECKING
+
+from . import utility
+from .cancellationtoken import Cancelled
+from .path import ROOT_DIRECTORY
+from .settings import Settings
+
+if TYPE_CHECKING:
+    from collections.abc import Generator
+
+
+class Span:
+    def __init__(self, name: str, category: str, args: dict[str, object], parent: Span | None) -> None:
+        self.name = name
+        self.category = category
+        self.args = args
+        self.bytes: int | None = None
+        self.outcome = "ok"
+        self.children: list[Span] = []
+        self.parent = parent
+        self.start_time = time.time()
+        self._start = time.perf_counter_ns()
+        self._end: int | None = None
+        self._thread_id = threading.get_ident()
+
+    @property
+    def duration(self) -> float | None:
+        """The duration in seconds, `None` while the span is open."""
+        return None if self._end is None else (self._end - self._start) / 1e9
+
+    def finish(self) -> None:
+        self._end = time.perf_counter_ns()
+
+    def to_dict(self) -> dict[str, object]:
+        return {
+            "name": self.name,
+            "category": self.category,
+            "start": self.start_time,
+            "duration": self.duration,
+            "bytes": self.bytes,
+            "outcome": self.outcome,
+            "args": self.args,
+            "children": [child.to_dict() for child in self.children],
+        }
+
+    def to_trace_event(self) -> dict[str, object]:
+        return {
+            "name": self.name,
+            "cat": self.category,
+            "ph": "X",
+            "ts": self._start // 1000,
+            "dur": ((self._end or self._start) - self._start) // 1000,
+            "pid": os.getpid(),
+            "tid": self._thread_id,
+            "args": {**self.args, "bytes": self.bytes, "outcome": self.outcome},
+        }
+
+
+@utility.typed_namespace
+class Tracer:
+    """Records spans while `Settings.tracing_enabled` is set; otherwise `span` does no more than check the setting."""
+
+    FILE = ROOT_DIRECTORY / "logs" / "trace.json"
+    _MAX_FILE_SIZE = 1024 * 1024
+    _LAUNCH_CATEGORY = "launch"
+    _RECENT_LAUNCH_COUNT = 20
+
+    def __init__(self) -> None:
+        self._local = threading.local()
+        self._recent_launches: deque[Span] = deque(maxlen=self._RECENT_LAUNCH_COUNT)
+        self._file: IO[str] | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def recent_launches(self) -> tuple[Span, ...]:
+        """The spans of the most recent launches, oldest first."""
+        with self._lock:
+            return tuple(self._recent_launches)
+
+    @property
+    def current_span(self) -> Span | None:
+        """The innermost span open on this thread."""
+        stack = self._get_stack()
+        return stack[-1] if stack else None
+
+    @contextlib.contextmanager
+    def continue_span(self, span: Span | None) -> Generator[None]:
+        """Make the spans opened on this thread within the block children of `span`, which belongs to another thread."""
+        if span is None:
+            yield
+            return
+        stack = self._get_stack()
+        stack.append(span)
+        try:
+            yield
+        finally:
+            stack.remove(span)
+
+    def span(self, name: str, category: str, **args: object) -> contextlib.AbstractContextManager[Span]:
+        """Time the enclosed block, yielding the span so that the block can set its bytes and arguments.
+
+        The outcome is `"ok"`, `"cancelled"` or the name of the exception the block raised. While tracing is disabled,
+        a fresh span that is never recorded is yielded, so that what the block sets on it is discarded along with it.
+        """
+        if not Settings.tracing_enabled:
+            return contextlib.nullcontext(Span(name, category, args, None))
+        return self._record(name, category, args)
+
+    @contextlib.contextmanager
+    def _record(self, name: str, category: str, args: dict[str, object]) -> Generator[Span]:
+        stack = self._get_stack()
+        span = Span(name, category, args, stack[-1] if stack else None)
+        stack.append(span)
+        try:
+            yield span
+        except Cancelled:
+            span.outcome = "cancelled"
+            raise
+        except BaseException as e:
+            span.outcome = type(e).__name__
+            raise
+        finally:
+            span.finish()
+            # A span opened in a generator may outlive spans opened by its consumer in the meantime.
+            stack.remove(span)
+            self._add(span)
+
+    def _get_stack(self) -> list[Span]:
+        stack: list[Span] | None = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _add(self, span: Span) -> None:
+        with self._lock:
+            if span.parent:
+                span.parent.children.append(span)
+            elif span.category == self._LAUNCH_CATEGORY:
+                self._recent_launches.append(span)
+            try:
+                self._write(span)
+            except OSError:
+                logging.exception("Couldn't write to the trace file.")
+
+    def _write(self, span: Span) -> None:
+        # The JSON array format of trace events allows the closing bracket to be missing, so events can be appended.
+        if self._file and self._file.tell() > self._MAX_FILE_SIZE:
+            self._file.close()
+            self._file = None
+            self.FILE.replace(self.FILE.with_name(self.FILE.stem + ".1" + self.FILE.suffix))
+        if not self._file:
+            self.FILE.parent.mkdir(parents=True, exist_ok=True)
+            self._file = self.FILE.open("a", encoding="utf-8")
+            if not self._file.tell():
+                self._file.write("[\n")
+        self._file.write(json.dumps(span.to_trace_event(), default=str) + ",\n")
+        self._file.flush()
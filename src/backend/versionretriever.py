@@ -1,53 +1,193 @@
 from __future__ import annotations
 
-import requests
+import hashlib
+import logging
+import threading
+import time
+from typing import TYPE_CHECKING, Literal
+
+from ordered_set import OrderedSet
 from pydantic import BaseModel, TypeAdapter, ValidationError
 
-from . import utility
-from .core import Architecture, Version
-from .path import ROOT_DIRECTORY
+from . import utility, versionsnapshot
+from .core import Architecture, Version, VersionCatalog
+from .net import throttle
+from .net.transport import TRANSPORT
+from .path import VERSIONS_DIRECTORY
+from .settings import Settings
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from pathlib import Path
+
+    from .core import VersionCatalogDiff
 
 
 @utility.typed_namespace
 class VersionRetriever:
-    DIRECTORY = ROOT_DIRECTORY / "versions"
+    """Keeps the version list, which is served from disk and revalidated in the background.
 
-    _SUPPORTED_ARCHITECTURES = frozenset({Architecture.X64, Architecture.X86})
-    _CONFIG = DIRECTORY / "versions.json"
+    A refresh is started when the list is read after not having been revalidated for `_MAX_AGE` seconds, and on the
+    schedule configured in the settings. Only one refresh runs at a time; requests made meanwhile join the running one
+    instead of starting another.
+    """
 
-    _versions = ()
+    DIRECTORY = VERSIONS_DIRECTORY
 
-    def get_versions_locally(self) -> tuple[Version, ...]:
+    _SUPPORTED_ARCHITECTURES = frozenset({Architecture.X64, Architecture.X86})
+    _CONFIG = DIRECTORY / "versions.json"
+    _VALIDATORS = DIRECTORY / "versions.validators.json"
+    _SNAPSHOT = DIRECTORY / "versions.snapshot"
+    _URL = "https://raw.githubusercontent.com/dummydummy123456/BedrockDB/main/versions.json"
+    _MAX_AGE = 10 * 60
+    _RETRY_DELAY = 60
+
+    def __init__(self) -> None:
+        self._versions = VersionCatalog()
+        self._subscribers: OrderedSet[Callable[[VersionCatalogDiff], object]] = OrderedSet({})
+        self._next_refresh_time: float | None = None
+        self._refresh_thread: threading.Thread | None = None
+        self._refresh_lock = threading.Lock()
+        self._schedule_changed = threading.Event()
+
+    @property
+    def stale(self) -> bool:
+        """Whether the list is due to be revalidated. It never is before refreshing has been started."""
+        return self._next_refresh_time is not None and time.monotonic() >= self._next_refresh_time
+
+    def get_versions_locally(self) -> VersionCatalog:
+        if self.stale:
+            self.refresh_in_background()
         if self._versions:
             return self._versions
 
         try:
-            with (self._CONFIG).open() as f:
+            with (self._CONFIG).open("rb") as f:
                 data = f.read()
         except OSError:
-            return ()
+            return VersionCatalog()
 
-        self._versions = self._parse_json(data)
+        self._versions = self._load_versions(data)
         return self._versions
 
-    def get_versions_remotely(self) -> tuple[Version, ...]:
-        res = requests.get(
-            "https://raw.githubusercontent.com/dummydummy123456/BedrockDB/main/versions.json",
-            timeout=10,
-        )
-        with (self._CONFIG).open("w") as f:
-            f.write(res.text)
-        self._versions = self._parse_json(res.text)
+    def get_versions_remotely(self) -> VersionCatalog:
+        """Fetch the version list, unless the copy on disk is still current according to its validators.
+
+        Subscribers are notified of the differences to the previous list.
+        """
+        with TRANSPORT.get(self._URL, headers=self._get_conditional_headers()) as res:
+            if res.status_code == 304:
+                logging.debug("The version list hasn't changed.")
+                return self._versions
+            res.raise_for_status()
+            data = throttle.read_content(res)
+            validators_model = _ValidatorsModel(
+                format_version=1,
+                etag=res.headers.get("ETag"),
+                last_modified=res.headers.get("Last-Modified"),
+            )
+
+        previous_versions = self.get_versions_locally()
+        versions = self._load_versions(data)
+        if not versions:
+            logging.warning("The fetched version list is invalid, keeping the current one.")
+            return previous_versions
+        _write_atomically(self._CONFIG, data)
+        _write_atomically(self._VALIDATORS, validators_model.model_dump_json(indent=2).encode())
+        diff = previous_versions.diff(versions)
+        self._versions = versions
+        if diff:
+            logging.debug(
+                "The version list has changed: %s added, %s removed, %s changed.",
+                len(diff.added),
+                len(diff.removed),
+                len(diff.changed),
+            )
+            self._notify_subscribers(diff)
         return self._versions
 
-    def _parse_json(self, data: str) -> tuple[Version, ...]:
+    def refresh_in_background(self) -> None:
+        with self._refresh_lock:
+            if self._refresh_thread and self._refresh_thread.is_alive():
+                return
+            self._refresh_thread = threading.Thread(target=self._refresh, name="VersionRefresh", daemon=True)
+            self._refresh_thread.start()
+
+    def start_refreshing(self) -> None:
+        """Start the scheduled refreshes and the refreshes of stale reads, beginning with one right away."""
+        self._next_refresh_time = time.monotonic()
+        self.refresh_in_background()
+        threading.Thread(target=self._run_schedule, name="VersionRefreshSchedule", daemon=True).start()
+
+    def reschedule(self) -> None:
+        """Make the schedule pick up a changed refresh interval."""
+        self._schedule_changed.set()
+
+    def subscribe_to_change(self, subscriber: Callable[[VersionCatalogDiff], object]) -> None:
+        self._subscribers.add(subscriber)
+
+    def _refresh(self) -> None:
+        try:
+            self.get_versions_remotely()
+        except Exception:
+            logging.exception("Couldn't refresh the version list.")
+            self._next_refresh_time = time.monotonic() + self._RETRY_DELAY
+        else:
+            self._next_refresh_time = time.monotonic() + self._MAX_AGE
+
+    def _run_schedule(self) -> None:
+        while True:
+            if self._schedule_changed.wait(Settings.version_refresh_interval):
+                self._schedule_changed.clear()
+                continue
+            self.refresh_in_background()
+
+    def _notify_subscribers(self, diff: VersionCatalogDiff) -> None:
+        # The versions have been replaced already, so a failing subscriber neither fails the refresh nor skips others.
+        for subscriber in tuple(self._subscribers):
+            try:
+                subscriber(diff)
+            except Exception:
+                logging.exception("Couldn't notify a subscriber of the version list change.")
+
+    def _get_conditional_headers(self) -> dict[str, str]:
+        if not self.get_versions_locally():
+            return {}
+        try:
+            with self._VALIDATORS.open() as f:
+                validators_model = _ValidatorsModel.model_validate_json(f.read(), strict=True)
+        except (OSError, ValidationError):
+            return {}
+        headers: dict[str, str] = {}
+        if validators_model.etag:
+            headers["If-None-Match"] = validators_model.etag
+        if validators_model.last_modified:
+            headers["If-Modified-Since"] = validators_model.last_modified
+        return headers
+
+    def _load_versions(self, data: bytes) -> VersionCatalog:
+        """Parse the version list, using the snapshot of it if there is a current one."""
+        source_digest = hashlib.sha256(data).digest()
+        versions = versionsnapshot.load(self._SNAPSHOT, source_digest)
+        if versions is not None:
+            return versions
+
+        versions = self._parse_json(data)
+        if versions:
+            try:
+                versionsnapshot.save(self._SNAPSHOT, source_digest, versions)
+            except OSError:
+                logging.exception("Couldn't save the snapshot of the version list.")
+        return versions
+
+    def _parse_json(self, data: bytes) -> VersionCatalog:
         type_adapter = TypeAdapter(list[_VersionModel])
         try:
             version_models = type_adapter.validate_json(data, strict=True)
         except ValidationError:
-            return ()
+            return VersionCatalog()
 
-        return tuple(
+        return VersionCatalog(
             Version(
                 version_model.name,
                 version_model.type,
@@ -56,14 +196,22 @@ class VersionRetriever:
                     for architecture, guids in version_model.guids.model_dump().items()
                     if (architecture in self._SUPPORTED_ARCHITECTURES) and guids
                 },
-                {
-                    architecture: self.DIRECTORY / f"{version_model.name}_{architecture}.Appx"
-                    for architecture, guids in version_model.guids.model_dump().items()
-                    if (architecture in self._SUPPORTED_ARCHITECTURES) and guids
-                },
             )
-            for version_model in version_models
-        )[::-1]
+            for version_model in reversed(version_models)
+        )
+
+
+def _write_atomically(file: Path, data: bytes) -> None:
+    temp_file = file.with_name(file.name + ".tmp")
+    with temp_file.open("wb") as f:
+        f.write(data)
+    temp_file.replace(file)
+
+
+class _ValidatorsModel(BaseModel):
+    format_version: Literal[1]
+    etag: str | None
+    last_modified: str | None
 
 
 class _VersionModel(BaseModel):
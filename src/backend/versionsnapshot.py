@@ -0,0 +1,108 @@
+"""A compact binary copy of a parsed version catalog, which is much cheaper to load than the JSON it was parsed from.
+
+A snapshot starts with a header that holds the schema version and the SHA-256 of the JSON it was made from, so it is
+only used while both match. It is followed by a table of the distinct strings, in which every name and GUID is stored
+once, and by the versions as a flat sequence of integers that refer to that table. The file is memory-mapped, and
+the integers are unpacked with a single call.
+"""
+
+from __future__ import annotations
+
+import itertools
+import mmap
+import struct
+import sys
+from typing import TYPE_CHECKING
+
+from .core import Architecture, Version, VersionCatalog
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+
+def load(file: Path, source_digest: bytes) -> VersionCatalog | None:
+    """Load the catalog saved to `file`, or return `None` if there is none for the source with `source_digest`."""
+    try:
+        with file.open("rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            return _decode(buffer, source_digest)
+    except (OSError, ValueError, IndexError, struct.error):
+        return None
+
+
+def save(file: Path, source_digest: bytes, catalog: VersionCatalog) -> None:
+    temp_file = file.with_name(file.name + ".tmp")
+    with temp_file.open("wb") as f:
+        f.write(_encode(source_digest, catalog))
+    temp_file.replace(file)
+
+
+_MAGIC = b"NLVC"
+# Has to be bumped whenever the layout or the way the JSON is turned into versions changes.
+_SCHEMA_VERSION = 2
+_HEADER = struct.Struct("<4sH32sIII")
+_TYPES = tuple(Version.Type)
+_ARCHITECTURES = tuple(Architecture)
+
+
+def _encode(source_digest: bytes, catalog: VersionCatalog) -> bytes:
+    string_to_index: dict[str, int] = {}
+
+    def intern(string: str) -> int:
+        return string_to_index.setdefault(string, len(string_to_index))
+
+    integers: list[int] = []
+    for version in catalog:
+        integers += (intern(version.name), _TYPES.index(version.type), len(version.architecture_to_guids))
+        for architecture, guids in version.architecture_to_guids.items():
+            integers += (_ARCHITECTURES.index(architecture), len(guids))
+            integers += (intern(guid) for guid in guids)
+
+    encoded_strings = [string.encode() for string in string_to_index]
+    offsets = [0]
+    for encoded_string in encoded_strings:
+        offsets.append(offsets[-1] + len(encoded_string))
+    return b"".join(
+        (
+            _HEADER.pack(_MAGIC, _SCHEMA_VERSION, source_digest, len(catalog), len(encoded_strings), len(integers)),
+            struct.pack(f"<{len(offsets)}I", *offsets),
+            struct.pack(f"<{len(integers)}I", *integers),
+            *encoded_strings,
+        ),
+    )
+
+
+def _decode(buffer: mmap.mmap, source_digest: bytes) -> VersionCatalog | None:
+    magic, schema_version, digest, version_count, string_count, integer_count = _HEADER.unpack_from(buffer)
+    if (magic, schema_version, digest) != (_MAGIC, _SCHEMA_VERSION, source_digest):
+        return None
+    position = _HEADER.size
+    offsets = struct.unpack_from(f"<{string_count + 1}I", buffer, position)
+    position += (string_count + 1) * 4
+    integers = struct.unpack_from(f"<{integer_count}I", buffer, position)
+    position += integer_count * 4
+    if position + offsets[-1] > len(buffer):
+        error_msg = "The snapshot is truncated."
+        raise ValueError(error_msg)
+    # Every string is needed to build the catalog, so they are all decoded at once.
+    string_data = buffer[position : position + offsets[-1]]
+    strings = [sys.intern(string_data[start:end].decode()) for start, end in itertools.pairwise(offsets)]
+
+    versions: list[Version] = []
+    cursor = 0
+    for _ in range(version_count):
+        name_index, type_index, architecture_count = integers[cursor : cursor + 3]
+        cursor += 3
+        architecture_to_guids: dict[Architecture, list[str]] = {}
+        for _ in range(architecture_count):
+            architecture_index, guid_count = integers[cursor : cursor + 2]
+            cursor += 2
+            architecture_to_guids[_ARCHITECTURES[architecture_index]] = [
+                strings[index] for index in integers[cursor : cursor + guid_count]
+            ]
+            cursor += guid_count
+        versions.append(Version(strings[name_index], _TYPES[type_index], architecture_to_guids))
+    if cursor != integer_count:
+        error_msg = "The snapshot is malformed."
+        raise ValueError(error_msg)
+    return VersionCatalog(versions)
+
@@ -23,11 +23,13 @@ export function App() {
 	const storeReady = useStore((state) => state.ready);
 	const instanceGroups = useStore((state) => state.instanceGroups);
 	const reloadInstanceGroups = useStore((state) => state.reloadInstanceGroups);
+	const applyVersionCatalogDiff = useStore((state) => state.applyVersionCatalogDiff);
 
 	// biome-ignore lint/correctness/useExhaustiveDependencies: False positive
 	useEffect(() => {
 		if (import.meta.env.PROD) {
 			exposeStaticFunction("onSuddenChange", reloadInstanceGroups);
+			exposeStaticFunction("onVersionCatalogChange", applyVersionCatalogDiff);
 		}
 		pywebview.api.getLastInstanceDirname().then((dirname) => {
 			if (dirname !== null) {
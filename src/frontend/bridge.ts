@@ -1,4 +1,13 @@
-import type { InstanceGroup, VersionTypeToVersions } from "@/core-types";
+import type {
+	Download,
+	InstanceGroup,
+	Report,
+	Span,
+	VersionCatalogDiff,
+	VersionQueryResult,
+	VersionType,
+	VersionTypeToVersions,
+} from "@/core-types";
 import type { MarkWritable } from "ts-essentials";
 
 export function exposeStaticFunction<N extends keyof API["static"]>(name: N, func: API["static"][N]) {
@@ -27,6 +36,16 @@ declare global {
 			readonly getInstanceGroups: () => Promise<readonly InstanceGroup[]>;
 			readonly getLastInstanceDirname: () => Promise<string | null>;
 			readonly getVersionTypeToVersions: (remotely?: boolean) => Promise<VersionTypeToVersions>;
+			readonly queryVersions: (
+				versionType?: VersionType | null,
+				search?: string,
+				offset?: number,
+				limit?: number | null,
+			) => Promise<VersionQueryResult>;
+			readonly getInstalledVersions: () => Promise<
+				readonly { readonly displayName: string; readonly architecture: string }[]
+			>;
+			readonly refreshVersions: () => Promise<void>;
 			readonly toggleInstanceGroupHidden: (name: string) => Promise<void>;
 			readonly moveInstanceGroup: (position: number, groupName: string) => Promise<void>;
 			readonly moveInstances: (position: number, groupName: string, dirnames: readonly string[]) => Promise<void>;
@@ -39,21 +58,33 @@ declare global {
 			readonly openInstanceDirectory: (dirname: string) => Promise<void>;
 			readonly launchInstance: (dirname: string) => Promise<void>;
 			readonly cancelInstanceLaunch: () => Promise<void>;
+			readonly resetInstanceAccessGrants: (dirname: string) => Promise<void>;
+			readonly getDownloads: () => Promise<readonly Download[]>;
+			readonly enqueueDownload: (versionDisplayName: string, architecture: string) => Promise<void>;
+			readonly moveDownload: (position: number, versionDisplayName: string, architecture: string) => Promise<void>;
+			readonly cancelDownload: (versionDisplayName: string, architecture: string) => Promise<void>;
+			readonly getBandwidthLimit: () => Promise<number | null>;
+			readonly setBandwidthLimit: (kilobytesPerSecond: number | null) => Promise<void>;
+			readonly getVersionRefreshInterval: () => Promise<number | null>;
+			readonly setVersionRefreshInterval: (minutes: number | null) => Promise<void>;
+			readonly getPrewarmEnabled: () => Promise<boolean>;
+			readonly setPrewarmEnabled: (enabled: boolean) => Promise<void>;
+			readonly getLinkCacheStatistics: () => Promise<{ hits: number; misses: number }>;
+			readonly getTracingEnabled: () => Promise<boolean>;
+			readonly setTracingEnabled: (enabled: boolean) => Promise<void>;
+			readonly getLaunchTimings: () => Promise<readonly Span[]>;
 		};
 	};
 }
 
 // biome-ignore lint/style/useNamingConvention: False positive
 export interface API {
-	readonly static: { readonly onSuddenChange: () => void };
+	readonly static: {
+		readonly onSuddenChange: () => void;
+		readonly onVersionCatalogChange: (diff: VersionCatalogDiff) => void;
+	};
 	readonly temporary: {
-		readonly propelLaunchReport: (
-			report: {
-				readonly type: 0 | 1;
-				readonly text: string;
-				readonly progress: { readonly processed: number; readonly totalsize: number; readonly unit: string } | null;
-			} | null,
-		) => void;
+		readonly propelLaunchReport: (report: Report | null) => void;
 	};
 }
 
@@ -72,6 +103,6 @@ function notExposedTemporaryFunction() {
 const exposedStaticFunctionNames: Set<keyof API["static"]> = new Set();
 
 (window as unknown as { webview: API }).webview = {
-	static: { onSuddenChange: notExposedStaticFunction },
+	static: { onSuddenChange: notExposedStaticFunction, onVersionCatalogChange: notExposedStaticFunction },
 	temporary: { propelLaunchReport: notExposedTemporaryFunction },
 };
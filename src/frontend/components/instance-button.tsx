@@ -351,9 +351,14 @@ function LaunchDialogContent({ dirname, trigger }: { readonly dirname: string; r
 					<div>{report?.text}</div>
 					<div className="flex-1" />
 					{report?.progress && (
-						<div>{`${report.progress.processed.toFixed(1)}/${report.progress.totalsize.toFixed(1)} ${
-							report.progress.unit
-						}`}</div>
+						<div>
+							{`${report.progress.processed.toFixed(1)}/${report.progress.totalsize.toFixed(1)} ${
+								report.progress.unit
+							}`}
+							{report.progress.speed !== null &&
+								` · ${report.progress.speed.toFixed(1)} ${report.progress.unit}/s`}
+							{report.progress.eta !== null && ` · ${formatDuration(report.progress.eta)}`}
+						</div>
 					)}
 				</div>
 				{report?.progress ? (
@@ -398,3 +403,8 @@ function LaunchDialogContent({ dirname, trigger }: { readonly dirname: string; r
 		</>
 	);
 }
+
+function formatDuration(seconds: number) {
+	const minutes = Math.floor(seconds / 60);
+	return minutes ? `${minutes}m ${Math.round(seconds % 60)}s` : `${Math.round(seconds)}s`;
+}
@@ -14,6 +14,50 @@ export const versionTypes = ["release", "beta", "preview"] as const;
 
 export type VersionTypeToVersions = { readonly [K in (typeof versionTypes)[number]]: readonly Version[] };
 
+export type VersionType = (typeof versionTypes)[number];
+
+export interface VersionQueryResult {
+	readonly total: number;
+	readonly versions: readonly { readonly type: VersionType; readonly version: Version }[];
+}
+
+export interface VersionCatalogDiff {
+	readonly added: readonly { readonly type: VersionType; readonly index: number; readonly version: Version }[];
+	readonly removed: readonly { readonly type: VersionType; readonly displayName: string }[];
+	readonly changed: readonly { readonly type: VersionType; readonly version: Version }[];
+}
+
+export interface Report {
+	readonly type: 0 | 1;
+	readonly text: string;
+	readonly progress: {
+		readonly processed: number;
+		readonly totalsize: number;
+		readonly unit: string;
+		readonly speed: number | null;
+		readonly eta: number | null;
+	} | null;
+}
+
+export interface Span {
+	readonly name: string;
+	readonly category: string;
+	readonly start: number;
+	readonly duration: number | null;
+	readonly bytes: number | null;
+	readonly outcome: string;
+	readonly args: { readonly [key: string]: unknown };
+	readonly children: readonly Span[];
+}
+
+export interface Download {
+	readonly versionDisplayName: string;
+	readonly architecture: string;
+	readonly state: "queued" | "running" | "finished" | "failed" | "cancelled";
+	readonly interactive: boolean;
+	readonly report: Report | null;
+}
+
 export interface InstanceGroup {
 	readonly name: string;
 	readonly hidden: boolean;
@@ -6,6 +6,9 @@ if (import.meta.env.DEV) {
 			getInstanceGroups: () => Promise.resolve(instanceGroups),
 			getLastInstanceDirname: () => Promise.resolve(null),
 			getVersionTypeToVersions: () => Promise.resolve(versionTypeToVersions),
+			queryVersions: () => Promise.resolve({ total: 0, versions: [] }),
+			getInstalledVersions: () => Promise.resolve([]),
+			refreshVersions: () => Promise.resolve(),
 			toggleInstanceGroupHidden: () => Promise.resolve(),
 			moveInstanceGroup: () => Promise.resolve(),
 			moveInstances: () => Promise.resolve(),
@@ -18,6 +21,21 @@ if (import.meta.env.DEV) {
 			openInstanceDirectory: () => Promise.resolve(),
 			launchInstance: () => Promise.resolve(),
 			cancelInstanceLaunch: () => Promise.resolve(),
+			resetInstanceAccessGrants: () => Promise.resolve(),
+			getDownloads: () => Promise.resolve([]),
+			enqueueDownload: () => Promise.resolve(),
+			moveDownload: () => Promise.resolve(),
+			cancelDownload: () => Promise.resolve(),
+			getBandwidthLimit: () => Promise.resolve(null),
+			setBandwidthLimit: () => Promise.resolve(),
+			getVersionRefreshInterval: () => Promise.resolve(60),
+			setVersionRefreshInterval: () => Promise.resolve(),
+			getPrewarmEnabled: () => Promise.resolve(false),
+			setPrewarmEnabled: () => Promise.resolve(),
+			getLinkCacheStatistics: () => Promise.resolve({ hits: 0, misses: 0 }),
+			getTracingEnabled: () => Promise.resolve(false),
+			setTracingEnabled: () => Promise.resolve(),
+			getLaunchTimings: () => Promise.resolve([]),
 		},
 	};
 
@@ -1,4 +1,4 @@
-import type { VersionTypeToVersions } from "@/core-types";
+import { type VersionCatalogDiff, type VersionTypeToVersions, versionTypes } from "@/core-types";
 import { create } from "zustand";
 
 interface State {
@@ -7,6 +7,7 @@ interface State {
 	readonly reloadInstanceGroups: () => void;
 	readonly versionTypeToVersions: VersionTypeToVersions;
 	readonly reloadVersionTypeToVersions: (remotely: boolean) => void;
+	readonly applyVersionCatalogDiff: (diff: VersionCatalogDiff) => void;
 }
 
 export const useStore = create<State>((set) => ({
@@ -14,8 +15,40 @@ export const useStore = create<State>((set) => ({
 	instanceGroups: [],
 	reloadInstanceGroups: async () => set({ instanceGroups: await pywebview.api.getInstanceGroups() }),
 	versionTypeToVersions: { release: [], beta: [], preview: [] },
-	reloadVersionTypeToVersions: async (remotely) =>
-		set({ versionTypeToVersions: await pywebview.api.getVersionTypeToVersions(remotely) }),
+	reloadVersionTypeToVersions: async (remotely) => {
+		if (remotely) {
+			// The changes arrive through `onVersionCatalogChange`.
+			await pywebview.api.refreshVersions();
+		} else {
+			set({ versionTypeToVersions: await pywebview.api.getVersionTypeToVersions() });
+		}
+	},
+	applyVersionCatalogDiff: (diff) =>
+		set((state) => ({
+			versionTypeToVersions: Object.fromEntries(
+				versionTypes.map((versionType) => {
+					const removedDisplayNames = new Set(
+						diff.removed.filter((entry) => entry.type === versionType).map((entry) => entry.displayName),
+					);
+					const displayNameToChangedVersion = new Map(
+						diff.changed
+							.filter((entry) => entry.type === versionType)
+							.map((entry) => [entry.version.displayName, entry.version]),
+					);
+					const versions = state.versionTypeToVersions[versionType]
+						.filter((version) => !removedDisplayNames.has(version.displayName))
+						.map((version) => displayNameToChangedVersion.get(version.displayName) ?? version);
+					// The versions may have been fetched after the refresh the diff belongs to, so they can already be there.
+					const displayNames = new Set(versions.map((version) => version.displayName));
+					for (const entry of diff.added) {
+						if (entry.type === versionType && !displayNames.has(entry.version.displayName)) {
+							versions.splice(entry.index, 0, entry.version);
+						}
+					}
+					return [versionType, versions];
+				}),
+			) as VersionTypeToVersions,
+		})),
 }));
 
 async function prepareStore() {
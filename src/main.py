@@ -46,6 +46,9 @@ class FrontendAPIStatic:
     def on_sudden_change(self) -> None:
         self.window.evaluate_js("webview.static.onSuddenChange()")
 
+    def on_version_catalog_change(self, diff: dict[str, object]) -> None:
+        self.window.evaluate_js(f"webview.static.onVersionCatalogChange({json.dumps(diff)})")
+
 
 @dataclass(frozen=True, slots=True)
 class FrontendAPITemporary: